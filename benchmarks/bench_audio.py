@@ -0,0 +1,47 @@
+"""
+Real-time factor of the WAV renderer: seconds of audio rendered per
+wall-clock second, for single notes, rolled chords and six-note chords.
+
+    python benchmarks/bench_audio.py --rolls 2000 --tet 24
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import audio # noqa: E402
+import dice # noqa: E402
+import export # noqa: E402
+
+def _voicing(rolls, chord):
+    for roll in rolls:
+        if chord is not None:
+            roll["chord"] = chord
+        yield roll
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rolls", type=int, default=2000)
+    parser.add_argument("--tet", type=int, default=12)
+    parser.add_argument("--block-size", type=int, default=audio.DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    cases = (("single", "none"), ("rolled chords", None), ("six-note chords", "11"))
+    print(f"{'voicing':>16} {'audio s':>9} {'wall s':>8} {'realtime x':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.wav")
+        for name, chord in cases:
+            rolls = _voicing(export.iter_rolls(args.rolls, args.tet, dice.Roller(0)), chord)
+            start = time.perf_counter()
+            audio.render_wav(rolls, path, args.tet, block_size=args.block_size)
+            elapsed = time.perf_counter() - start
+            with wave.open(path, "rb") as rendered:
+                seconds = rendered.getnframes() / rendered.getframerate()
+            print(f"{name:>16} {seconds:>9.1f} {elapsed:>8.2f} {seconds / elapsed:>10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Scaling benchmark for the roll farm: reports rolls/sec for 1..N workers.
+
+    python benchmarks/bench_farm.py --rolls 5000000 --max-workers 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import farm # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rolls", type=int, default=2_000_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=farm.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--tet", type=int, default=12)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>7} {'seconds':>9} {'rolls/sec':>12} {'speedup':>8}")
+    for workers in range(1, args.max_workers + 1):
+        start = time.perf_counter()
+        rolled = 0
+        for batch in farm.roll_farm(args.rolls, args.tet, seed=0, workers=workers, chunk_size=args.chunk_size):
+            rolled += len(batch)
+        elapsed = time.perf_counter() - start
+        rate = rolled / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>7} {elapsed:>9.3f} {rate:>12,.0f} {rate / baseline:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Startup-to-first-frame time of the GUI: imports, window creation, app
+construction and the first roll on screen, each in a fresh interpreter.
+
+    python benchmarks/bench_first_frame.py --runs 10
+    python benchmarks/bench_first_frame.py --xvfb      # on a headless machine
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Run in each child process. Times are milliseconds since the child started
+# importing, matching what main.py measures.
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {src!r})
+import tkinter as tk
+from gui import ChanceMusicDiceApp
+imported = time.perf_counter()
+root = tk.Tk()
+window = time.perf_counter()
+app = ChanceMusicDiceApp(root, "benchmark", started_at=started)
+constructed = time.perf_counter()
+while app.first_frame_ms is None:
+    root.update()
+root.destroy()
+print(json.dumps({{
+    "imports_ms": (imported - started) * 1000,
+    "window_ms": (window - imported) * 1000,
+    "construct_ms": (constructed - window) * 1000,
+    "first_frame_ms": app.first_frame_ms,
+}}))
+"""
+
+def run_once():
+    completed = subprocess.run([sys.executable, "-c", CHILD.format(src=SRC_DIR)],
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--xvfb", action="store_true", help="start Xvfb if there is no display")
+    args = parser.parse_args()
+
+    xvfb = None
+    if args.xvfb and not os.environ.get("DISPLAY"):
+        from bench_suite import _start_xvfb
+        xvfb = _start_xvfb()
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        print("No display; run under xvfb-run or pass --xvfb (Xvfb must be installed).")
+        return 1
+
+    try:
+        runs = [run_once() for _ in range(args.runs)]
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    print(f"{'phase':<14} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for phase in ("imports_ms", "window_ms", "construct_ms", "first_frame_ms"):
+        values = [run[phase] for run in runs]
+        print(f"{phase[:-3]:<14} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Throughput and peak memory of the polyphonic engine as the number of
+voices and the length of the piece grow.
+
+    python benchmarks/bench_polyphony.py --voices 1 8 64 256 --beats 500 5000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import polyphony # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--voices", type=int, nargs="+", default=[1, 8, 64, 256])
+    parser.add_argument("--beats", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--tet", type=int, default=12)
+    args = parser.parse_args()
+
+    print(f"{'voices':>6} {'beats':>7} {'events':>10} {'events/sec':>12} {'peak KiB':>9}")
+    for voices in args.voices:
+        for beats in args.beats:
+            tracemalloc.start()
+            start = time.perf_counter()
+            events = sum(1 for _ in polyphony.iter_ensemble(voices, args.tet, seed=0, until=beats))
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{voices:>6} {beats:>7} {events:>10,} {events / elapsed:>12,.0f} {peak / 1024:>9,.0f}")
+
+if __name__ == "__main__":
+    main()
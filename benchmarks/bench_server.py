@@ -0,0 +1,118 @@
+"""
+Load test for the roll server: p50/p99 latency and requests/sec on localhost.
+
+    python benchmarks/bench_server.py --clients 64 --seconds 5
+    python benchmarks/bench_server.py --port 8765 --no-spawn   # against a running server
+"""
+import argparse
+import asyncio
+import base64
+import os
+import socket
+import subprocess
+import sys
+import time
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "server.py")
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def _wait_for_server(host, port, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+async def _http_client(host, port, path, stop_at, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("ascii")
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def _stream_client(host, port, seconds):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    writer.write(
+        f"GET /stream?client=bench HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\n"
+        f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode("ascii")
+    )
+    await reader.readuntil(b"\r\n\r\n")
+    messages = 0
+    stop_at = time.perf_counter() + seconds
+    while time.perf_counter() < stop_at:
+        _, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(await reader.readexactly(2), "big")
+        elif length == 127:
+            length = int.from_bytes(await reader.readexactly(8), "big")
+        await reader.readexactly(length)
+        messages += 1
+    writer.close()
+    return messages
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+async def run(args):
+    for path in ("/roll?client={i}", "/rolls?n=100&client={i}"):
+        latencies = []
+        stop_at = time.perf_counter() + args.seconds
+        await asyncio.gather(*(
+            _http_client(args.host, args.port, path.format(i=i), stop_at, latencies)
+            for i in range(args.clients)
+        ))
+        latencies.sort()
+        print(f"{path.split('?')[0]:<8} {args.clients} clients: {len(latencies) / args.seconds:>10,.0f} req/s  "
+              f"p50 {1000 * _percentile(latencies, 0.50):.2f} ms  p99 {1000 * _percentile(latencies, 0.99):.2f} ms")
+
+    messages = await _stream_client(args.host, args.port, args.seconds)
+    print(f"/stream  1 client: {messages / args.seconds:>11,.0f} rolls/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--no-spawn", action="store_true", help="use a server that is already running")
+    args = parser.parse_args()
+
+    process = None
+    if not args.no_spawn:
+        args.port = args.port or _free_port()
+        process = subprocess.Popen([sys.executable, SERVER_SCRIPT, "--host", args.host, "--port", str(args.port), "--seed", "0"],
+                                   stdout=subprocess.DEVNULL)
+    elif args.port is None:
+        parser.error("--port is required with --no-spawn")
+
+    try:
+        asyncio.run(_wait_for_server(args.host, args.port))
+        asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Startup-time check for the headless roller, run the documented way as
+`python -m dice`. Fails if the headless path imports the GUI stack, loads
+the dice engine twice, or goes over budget.
+
+    python benchmarks/bench_startup.py --budget-ms 150
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# The headless entry point, doing as little rolling as possible.
+ENTRY_POINT = ("-m", "dice", "--count", "0")
+
+# Modules that must never be imported on the headless path.
+GUI_MODULES = ("tkinter", "PIL", "gui", "webbrowser")
+
+def measure_imports(arguments=ENTRY_POINT):
+    """
+    Returns {module name: cumulative import time in microseconds} for
+    running `python <arguments>` in a fresh interpreter.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *arguments],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit():
+            timings[name] = int(cumulative)
+    return timings
+
+def measure_wall_ms(arguments, runs):
+    """
+    Returns the median wall-clock time in milliseconds of `python <arguments>`.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *arguments], cwd=SRC_DIR, stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="allowed startup time on top of a bare interpreter")
+    parser.add_argument("--runs", type=int, default=9)
+    args = parser.parse_args()
+
+    timings = measure_imports()
+    slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:10]
+    for name, micros in slowest:
+        print(f"{micros / 1000:>9.2f} ms  import {name}")
+
+    # Measured as a whole process, so the engine running as __main__ counts too.
+    interpreter_ms = measure_wall_ms(("-c", "pass"), args.runs)
+    total_ms = measure_wall_ms(ENTRY_POINT, args.runs) - interpreter_ms
+    print(f"python {' '.join(ENTRY_POINT)}: {total_ms:.2f} ms over a bare interpreter (budget {args.budget_ms:.0f} ms)")
+
+    leaked = sorted(name for name in timings if name.split(".")[0] in GUI_MODULES)
+    if leaked:
+        print(f"FAIL: headless startup pulled in {', '.join(leaked)}")
+        return 1
+    if "dice" in timings:
+        print("FAIL: the dice engine was loaded twice (as __main__ and as dice)")
+        return 1
+    if total_ms > args.budget_ms:
+        print("FAIL: over budget")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
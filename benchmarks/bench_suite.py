@@ -0,0 +1,258 @@
+"""
+Benchmark suite for the dice engine and the GUI hot paths, with a
+regression gate against a saved JSON baseline.
+
+    python benchmarks/bench_suite.py --save-baseline   # record this machine's baseline
+    python benchmarks/bench_suite.py                   # compare, exit 1 on regressions
+    python benchmarks/bench_suite.py --only engine --threshold 0.1
+    python benchmarks/bench_suite.py --xvfb            # run the GUI cases on a virtual display
+
+GUI cases need a display. Without one (and without --xvfb or xvfb-run)
+they are skipped rather than failed. Baselines are only meaningful on
+the machine that recorded them, so baseline.json is not checked in.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import dice # noqa: E402
+import dicesets # noqa: E402
+import rollstats # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.2 # Fail when throughput drops by more than this fraction
+DEFAULT_REPEATS = 5
+
+class SkipCase(Exception):
+    pass
+
+# --- Measuring ---
+
+def measure(operation, repeats=DEFAULT_REPEATS):
+    """
+    Returns the best throughput of `operation` in calls per second. The
+    number of calls per timing is picked by timeit so each takes at least
+    0.2 seconds; the best of `repeats` timings is kept, as it is the one
+    least disturbed by the rest of the machine.
+    """
+    timer = timeit.Timer(operation)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeats, number=number))
+    return number / best
+
+# --- Engine Cases ---
+
+def engine_cases():
+    rng = dice.Roller(0)
+    dice_set = dicesets.default_dice_set()
+    stats = rollstats.RollStatistics(dice_set)
+    roll = dice_set.roll(12, rng)
+    batch = dice_set.roll_batch(10_000, 12, rng)
+    return {
+        "roll_die duration": lambda: dice.roll_die(dice.duration_die, rng),
+        "roll_die chord": lambda: dice.roll_die(dice.chord_die, rng),
+        "roll_all_dice 12-TET": lambda: dice.roll_all_dice(12, rng),
+        "roll_all_dice 24-TET": lambda: dice.roll_all_dice(24, rng),
+        "roll_all_dice_batch 10k": lambda: dice.roll_all_dice_batch(10_000, 12, rng),
+        "RollStatistics.record": lambda: stats.record(roll, 12),
+        "RollStatistics.record_batch 10k": lambda: stats.record_batch(batch),
+    }
+
+# --- GUI Cases ---
+
+def _start_xvfb():
+    """
+    Starts Xvfb on a free display and points DISPLAY at it.
+    Returns the process, or None if Xvfb is not installed.
+    """
+    if shutil.which("Xvfb") is None:
+        return None
+    for number in range(99, 199):
+        if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            continue
+        process = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "1600x900x24", "-nolisten", "tcp"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.perf_counter() + 5
+        while not os.path.exists(f"/tmp/.X11-unix/X{number}") and time.perf_counter() < deadline:
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+        if process.poll() is None:
+            os.environ["DISPLAY"] = f":{number}"
+            return process
+    return None
+
+def gui_cases():
+    """
+    Builds the app in a real Tk window and returns its hot paths as cases.
+    Raises SkipCase when there is no display to open the window on.
+    """
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        raise SkipCase(f"no display ({e}); run under xvfb-run or pass --xvfb")
+
+    from gui import ChanceMusicDiceApp
+    root.geometry("1280x720")
+    try:
+        app = ChanceMusicDiceApp(root, "benchmark")
+    except tk.TclError as e:
+        root.destroy()
+        raise SkipCase(f"could not build the app on this display ({e})")
+    root.update()
+    app.draw_dice_placeholders()
+    app.roll_dice()
+    root.update()
+
+    image_path = app.get_asset_path(os.path.join("images", dice.get_duration_image_path("crotchet").split("/")[-1]))
+    # More sizes than the atlas keeps PhotoImages for, so every call misses.
+    sizes = itertools.cycle(range(100, 100 + (app.glyph_atlas.max_photos + 8) * 16, 16))
+    pitch_index = next(i for i, spec in enumerate(app.dice_set.dice) if spec.kind == "pitch")
+    pitch_items = app._ensure_content_items()[pitch_index]
+    pitches = itertools.cycle(dice.pitch_die_24tet)
+    rng = dice.Roller(0)
+
+    def resize_sweep():
+        size = next(sizes)
+        app.load_and_resize_image(image_path, size, size)
+
+    def pitch_layout():
+        app.update_pitch_display_on_canvas(next(pitches), app.die_coords[pitch_index], pitch_items)
+        root.update_idletasks()
+
+    def redraw():
+        app._last_roll = app.dice_set.roll(24, rng)
+        app.redraw_dice_content()
+        root.update_idletasks()
+
+    def relayout():
+        app.draw_dice_placeholders()
+        root.update_idletasks()
+
+    def use_prerendered_faces():
+        if not app.prerendered_faces.get():
+            app.prerendered_faces.set(True)
+            app.toggle_prerendered_faces()
+
+    def redraw_prerendered():
+        use_prerendered_faces()
+        redraw()
+
+    def relayout_prerendered():
+        use_prerendered_faces()
+        relayout()
+
+    # Pre-rendered face cases switch the app over, so they come last.
+    return {
+        "load_and_resize_image cached": lambda: app.load_and_resize_image(image_path, 200, 200),
+        "load_and_resize_image resize sweep": resize_sweep,
+        "update_pitch_display_on_canvas": pitch_layout,
+        "redraw_dice_content": redraw,
+        "draw_dice_placeholders": relayout,
+        "redraw_dice_content pre-rendered": redraw_prerendered,
+        "draw_dice_placeholders pre-rendered": relayout_prerendered,
+    }, root
+
+# --- Baseline and Gate ---
+
+def compare(results, baseline, threshold):
+    """
+    Returns the names of cases whose throughput fell more than
+    `threshold` below the baseline.
+    """
+    regressions = []
+    for name, rate in results.items():
+        previous = baseline.get(name)
+        if previous and rate < previous * (1 - threshold):
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed fractional drop in throughput (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--only", choices=("engine", "gui"), default=None)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--xvfb", action="store_true", help="start Xvfb if there is no display")
+    args = parser.parse_args()
+
+    xvfb = None
+    if args.xvfb and not os.environ.get("DISPLAY"):
+        xvfb = _start_xvfb()
+        if xvfb is None:
+            print("Xvfb is not available; GUI cases will be skipped.")
+
+    groups = []
+    if args.only in (None, "engine"):
+        groups.append(("engine", engine_cases))
+    if args.only in (None, "gui"):
+        groups.append(("gui", gui_cases))
+
+    results = {}
+    try:
+        for group, build in groups:
+            root = None
+            try:
+                cases = build()
+                if isinstance(cases, tuple):
+                    cases, root = cases
+            except SkipCase as e:
+                print(f"skipping {group} cases: {e}")
+                continue
+            try:
+                for name, operation in cases.items():
+                    results[name] = measure(operation, args.repeats)
+            finally:
+                if root is not None:
+                    root.destroy()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as fp:
+            baseline = json.load(fp).get("results", {})
+
+    print(f"{'case':<38} {'calls/sec':>14} {'baseline':>14} {'change':>8}")
+    for name, rate in results.items():
+        previous = baseline.get(name)
+        change = f"{rate / previous - 1:+.1%}" if previous else ""
+        previous_text = f"{previous:,.0f}" if previous else "-"
+        print(f"{name:<38} {rate:>14,.0f} {previous_text:>14} {change:>8}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fp:
+            json.dump({
+                "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "results": results,
+            }, fp, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline.")
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"FAIL: more than {args.threshold:.0%} slower than baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
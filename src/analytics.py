@@ -0,0 +1,157 @@
+"""
+Exact probabilities for the dice, worked out from their face tables
+rather than by rolling and counting.
+
+Single-roll answers are exact Fractions. Questions about sequences of N
+rolls are answered by dynamic programming over a small state machine, so
+their cost grows with N times the number of states, not with the number
+of possible sequences.
+"""
+import itertools
+import math
+from collections import defaultdict
+from fractions import Fraction
+
+import dice # Import our dice logic from dice.py
+
+# --- Single Dice ---
+
+def marginal(die_options):
+    """
+    Returns {face: probability} for one die. Repeated entries, like the
+    'none' faces of the chord die, add up to a heavier face.
+    """
+    table = dice.compile_die(die_options)
+    total = sum(table.weights)
+    return {face: Fraction(weight, total) for face, weight in zip(table.faces, table.weights)}
+
+def roll_marginals(tet_choice=12):
+    """
+    Returns {die name: {face: probability}} for every die in a roll.
+    """
+    return {
+        "duration": marginal(dice.duration_table),
+        "augmentation": marginal(dice.augmentation_table),
+        "chord": marginal(dice.chord_table),
+        "pitch": marginal(dice.pitch_table_for(tet_choice)),
+    }
+
+def joint_distribution(tet_choice=12, fields=dice.BATCH_DICE):
+    """
+    Returns {(face, ...): probability} over the named dice, in the order
+    given by `fields`. The dice are independent, so this is the product of
+    their marginals.
+    """
+    marginals = roll_marginals(tet_choice)
+    tables = [marginals[name].items() for name in fields]
+    joint = {}
+    for combination in itertools.product(*tables):
+        probability = Fraction(1)
+        for _, face_probability in combination:
+            probability *= face_probability
+        joint[tuple(face for face, _ in combination)] = probability
+    return joint
+
+def probability(predicate, tet_choice=12, fields=dice.BATCH_DICE):
+    """
+    Returns the exact probability that one roll satisfies `predicate`,
+    which is called with a roll dict holding the named dice.
+    """
+    return sum(
+        (p for faces, p in joint_distribution(tet_choice, fields).items() if predicate(dict(zip(fields, faces)))),
+        Fraction(0),
+    )
+
+# --- Durations ---
+
+def event_beats_distribution():
+    """
+    Returns {length in crotchet beats: probability} for one rolled note,
+    including the dot from the augmentation die.
+    """
+    distribution = defaultdict(Fraction)
+    for (duration, augmentation), p in joint_distribution(fields=("duration", "augmentation")).items():
+        distribution[dice.event_beats(duration, augmentation)] += p
+    return dict(distribution)
+
+def expected_event_beats():
+    """
+    Returns the exact expected length of one rolled note in crotchet beats.
+    """
+    return sum((beats * p for beats, p in event_beats_distribution().items()), Fraction(0))
+
+def event_beats_variance():
+    """
+    Returns the exact variance of one rolled note's length, in beats squared.
+    """
+    mean = expected_event_beats()
+    return sum(((beats - mean) ** 2 * p for beats, p in event_beats_distribution().items()), Fraction(0))
+
+def total_beats_distribution(n, exact=True):
+    """
+    Returns {total length in beats: probability} for a run of `n` notes,
+    by convolving the single-note distribution `n` times.
+    """
+    single = event_beats_distribution()
+    if not exact:
+        single = {beats: float(p) for beats, p in single.items()}
+    totals = {Fraction(0): Fraction(1) if exact else 1.0}
+    for _ in range(n):
+        combined = defaultdict(Fraction if exact else float)
+        for total, p in totals.items():
+            for beats, q in single.items():
+                combined[total + beats] += p * q
+        totals = combined
+    return dict(totals)
+
+# --- Information ---
+
+def entropy(distribution, base=2):
+    """
+    Returns the Shannon entropy of a {outcome: probability} mapping,
+    in bits by default.
+    """
+    return -sum(float(p) * math.log(float(p), base) for p in distribution.values() if p > 0)
+
+def roll_entropy(tet_choice=12, base=2):
+    """
+    Returns the entropy of a whole roll. The dice are independent, so this
+    is the sum of each die's entropy.
+    """
+    return sum(entropy(distribution, base) for distribution in roll_marginals(tet_choice).values())
+
+# --- Sequences ---
+
+def sequence_probability(n, step, start, accept=None, tet_choice=12, fields=dice.BATCH_DICE, exact=False):
+    """
+    Returns the probability that a run of `n` rolls is accepted by a small
+    state machine, worked out exactly by dynamic programming.
+
+    `step(state, roll)` returns the next state, or None to reject the
+    sequence; `roll` is a dict holding the dice named in `fields`. States
+    must be hashable, and `accept(state)` decides whether the final state
+    counts (all surviving states do if it is None). Keeping `fields` to the
+    dice the predicate looks at keeps the work small. Probabilities are
+    floats unless `exact` is true, since exact fractions grow quickly with n.
+
+    For example, the chance of no two breves in a row over 64 notes:
+
+        sequence_probability(64, lambda last, roll: None if last == roll["duration"] == "breve" else roll["duration"],
+                             start=None, fields=("duration",))
+    """
+    outcomes = [
+        (dict(zip(fields, faces)), p if exact else float(p))
+        for faces, p in joint_distribution(tet_choice, fields).items()
+    ]
+    states = {start: Fraction(1) if exact else 1.0}
+    for _ in range(n):
+        following = defaultdict(Fraction if exact else float)
+        for state, p in states.items():
+            for roll, q in outcomes:
+                next_state = step(state, roll)
+                if next_state is not None:
+                    following[next_state] += p * q
+        states = following
+
+    zero = Fraction(0) if exact else 0.0
+    return sum((p for state, p in states.items() if accept is None or accept(state)), zero)
@@ -0,0 +1,147 @@
+"""
+Offline audio rendering of rolled sequences to a WAV file.
+
+Each roll becomes one note (or chord) played for its dotted duration at
+the given tempo. Notes are synthesized with NumPy, one block of samples at
+a time, and each block is written out as soon as it is finished, so memory
+use stays the same however long the piece is.
+
+Needs NumPy, which the GUI and the rest of the dice engine do not:
+
+    pip install numpy
+"""
+import os
+import wave
+from fractions import Fraction
+
+import numpy as np
+
+import dice # Import our dice logic from dice.py
+
+DEFAULT_SAMPLE_RATE = 44_100
+DEFAULT_BLOCK_SIZE = 4096 # Samples synthesized and written at a time
+
+# Envelope shape, in seconds. Notes fade in over the attack, settle from
+# full level towards SUSTAIN_LEVEL, and fade out over the release once
+# their written duration is over, overlapping the start of the next note.
+ATTACK_SECONDS = 0.005
+DECAY_SECONDS = 0.2
+SUSTAIN_LEVEL = 0.6
+RELEASE_SECONDS = 0.08
+
+# Relative strengths of the first few harmonics of every oscillator.
+HARMONICS = (1.0, 0.4, 0.15)
+
+# Peak level of one note, shared between the notes of a chord so that
+# chords are no louder than single notes.
+NOTE_GAIN = 0.45
+
+class _Note:
+    """
+    One scheduled note: where it starts and stops in samples, and the
+    frequencies and amplitudes of all its partials.
+    """
+    __slots__ = ("onset", "length", "end", "frequencies", "amplitudes")
+
+    def __init__(self, onset, length, end, frequencies, amplitudes):
+        self.onset = onset
+        self.length = length
+        self.end = end
+        self.frequencies = frequencies
+        self.amplitudes = amplitudes
+
+def _partials(pitch, chord, tet_choice, reference_a4, sample_rate):
+    """
+    Returns (angular frequency per sample, amplitude) arrays for every
+    harmonic of every note in the chord, as column vectors.
+    """
+    root = dice.pitch_frequency(pitch, tet_choice, reference_a4)
+    intervals = dice.chord_intervals.get(chord, (0,))
+    harmonics = np.array(HARMONICS)
+    frequencies = np.outer(root * 2.0 ** (np.array(intervals) / 12), np.arange(1, len(HARMONICS) + 1)).ravel()
+    amplitudes = np.tile(harmonics * (NOTE_GAIN / (len(intervals) * harmonics.sum())), len(intervals))
+    audible = frequencies < sample_rate / 2
+    return (
+        (2 * np.pi / sample_rate * frequencies[audible])[:, np.newaxis],
+        amplitudes[audible],
+    )
+
+def _notes(rolls, tet_choice, tempo_bpm, sample_rate, reference_a4):
+    """
+    Yields a _Note for each roll. Onsets are worked out from the exact
+    running total of beats, so long pieces do not drift out of time.
+    """
+    samples_per_beat = Fraction(60 * sample_rate) / Fraction(tempo_bpm)
+    release = round(RELEASE_SECONDS * sample_rate)
+    partials = {}
+    beats = Fraction(0)
+    for roll in rolls:
+        onset = round(beats * samples_per_beat)
+        beats += dice.event_beats(roll["duration"], roll["augmentation"])
+        length = round(beats * samples_per_beat) - onset
+        key = (roll["pitch"], roll["chord"])
+        if key not in partials:
+            partials[key] = _partials(roll["pitch"], roll["chord"], tet_choice, reference_a4, sample_rate)
+        frequencies, amplitudes = partials[key]
+        yield _Note(onset, length, onset + length + release, frequencies, amplitudes)
+
+def _render_note(note, out, block_start, sample_rate):
+    """
+    Adds the part of `note` that falls inside this block to `out`.
+    """
+    start = max(note.onset, block_start)
+    stop = min(note.end, block_start + len(out))
+    t = np.arange(start - note.onset, stop - note.onset, dtype=np.float64)
+
+    envelope = np.minimum(t / (ATTACK_SECONDS * sample_rate), 1.0)
+    envelope *= SUSTAIN_LEVEL + (1 - SUSTAIN_LEVEL) * np.exp(-t / (DECAY_SECONDS * sample_rate))
+    if stop > note.onset + note.length:
+        envelope *= np.clip(1 - (t - note.length) / (RELEASE_SECONDS * sample_rate), 0.0, 1.0)
+
+    out[start - block_start:stop - block_start] += envelope * (note.amplitudes @ np.sin(note.frequencies * t))
+
+def render_wav(rolls, fp, tet_choice=12, tempo_bpm=120, sample_rate=DEFAULT_SAMPLE_RATE,
+               block_size=DEFAULT_BLOCK_SIZE, reference_a4=dice.DEFAULT_REFERENCE_A4):
+    """
+    Synthesizes the rolls into a 16-bit mono WAV file. `fp` is a path or a
+    seekable binary file. Rolls are read lazily, so `rolls` can be a
+    generator such as export.iter_rolls for pieces of any length.
+    Returns the number of rolls rendered.
+    """
+    if isinstance(fp, (str, os.PathLike)):
+        # Opened here, as wave.open leaves a half-built writer behind when it
+        # cannot open a path itself.
+        with open(fp, "wb") as binary_file:
+            return render_wav(rolls, binary_file, tet_choice, tempo_bpm, sample_rate, block_size, reference_a4)
+    notes = _notes(rolls, tet_choice, tempo_bpm, sample_rate, reference_a4)
+    pending = next(notes, None)
+    active = []
+    rendered = 0
+    piece_end = 0
+    block_start = 0
+
+    with wave.open(fp, "wb") as out_file:
+        out_file.setnchannels(1)
+        out_file.setsampwidth(2)
+        out_file.setframerate(sample_rate)
+
+        while pending is not None or active:
+            block_end = block_start + block_size
+            while pending is not None and pending.onset < block_end:
+                active.append(pending)
+                piece_end = max(piece_end, pending.end)
+                rendered += 1
+                pending = next(notes, None)
+
+            block = np.zeros(block_size)
+            for note in active:
+                _render_note(note, block, block_start, sample_rate)
+            active = [note for note in active if note.end > block_end]
+
+            if pending is None and not active:
+                block = block[:piece_end - block_start]
+            np.clip(block, -1.0, 1.0, out=block)
+            out_file.writeframes((block * 32767).astype("<i2").tobytes())
+            block_start = block_end
+
+    return rendered
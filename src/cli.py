@@ -0,0 +1,90 @@
+"""
+Headless command-line roller. Only the dice engine is imported, so this
+runs on machines without a display, tkinter or Pillow.
+
+    python -m dice --count 1000 --tet 24 --seed 42 --format jsonl
+    python main.py --count 1000 --format midi --output piece.mid
+    python -m dice --count 200 --tet 24 --format wav --output piece.wav
+    python -m dice --count 100 --dice-set my_dice.toml --format csv
+    python -m dice --count 16 --tet 31
+"""
+import argparse
+import os
+import sys
+
+import dice # Import our dice logic from dice.py
+import export
+
+def _parse_seed(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+def _tet_value(value):
+    try:
+        tet_choice = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a whole number: {value!r}")
+    if not 1 <= tet_choice <= dice.MAX_TET:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {dice.MAX_TET}")
+    return tet_choice
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="dice", description="Roll chance music dice without the GUI.")
+    parser.add_argument("-n", "--count", type=int, default=1, help="number of rolls (default: 1)")
+    parser.add_argument("--tet", type=_tet_value, default=12,
+                        help=f"equal divisions of the octave for the pitch die, 1 to {dice.MAX_TET} (default: 12)")
+    parser.add_argument("--seed", type=_parse_seed, default=None, help="seed for reproducible output")
+    parser.add_argument("-f", "--format", choices=export.EXPORT_FORMATS, default="jsonl", help="output format (default: jsonl)")
+    parser.add_argument("-o", "--output", default=None, help="output file (default: stdout, not allowed for midi or wav)")
+    parser.add_argument("--dice-set", default=None, help="roll the dice from a .toml or .json dice set file")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.count < 0:
+        parser.error("--count must not be negative")
+
+    dice_set = None
+    if args.dice_set is not None:
+        import dicesets
+        try:
+            dice_set = dicesets.load_dice_set(args.dice_set)
+        except dicesets.DiceSetError as e:
+            parser.error(str(e))
+
+    rng = dice.Roller(args.seed)
+    if args.output is not None:
+        try:
+            export.export_rolls(args.output, args.format, args.count, args.tet, rng, dice_set=dice_set)
+        except ValueError as e:
+            parser.error(str(e))
+        except OSError as e:
+            parser.error(f"could not write {args.output}: {e.strerror or e}")
+        return 0
+
+    if args.format not in ("jsonl", "csv"):
+        parser.error(f"{args.format.upper()} output needs a seekable file; pass --output")
+
+    # Same bytes as --output gives: UTF-8 (for pitches like Fⵐ, whatever the
+    # console encoding) and no newline translation (CSV rows end in \r\n).
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8", newline="")
+    rolls = export.iter_rolls(args.count, args.tet, rng, dice_set=dice_set)
+    try:
+        if args.format == "jsonl":
+            export.write_jsonl(rolls, sys.stdout)
+        else:
+            export.write_csv(rolls, sys.stdout)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader stopped early, e.g. `| head`. Point stdout at devnull so
+        # the interpreter's final flush doesn't report the error again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,11 @@
+import functools
+import hashlib
+import itertools
+import math
 import random
+import secrets
+from fractions import Fraction
+from array import array
 
 # Base directory for our assets
 ASSETS_DIR = "assets"
@@ -108,40 +115,619 @@ chord_die = [
     'none'
 ]
 
+# --- Musical Values ---
+
+# Length of each duration in crotchet beats, kept exact so dotted values
+# and long sequences add up without rounding.
+duration_beats = {
+    "breve": Fraction(8),
+    "semibreve": Fraction(4),
+    "minim": Fraction(2),
+    "crotchet": Fraction(1),
+    "quaver": Fraction(1, 2),
+    "semiquaver": Fraction(1, 4),
+    "demisemiquaver": Fraction(1, 8),
+    "hemidemisemiquaver": Fraction(1, 16),
+}
+
+# A dot adds half the note's value again.
+augmentation_factors = {
+    "Dot": Fraction(3, 2),
+    "No Dot": Fraction(1),
+}
+
+# Intervals in semitones above the root for each chord quality.
+# 'none' means the pitch is played on its own.
+chord_intervals = {
+    'maj': (0, 4, 7),
+    'min': (0, 3, 7),
+    'dim': (0, 3, 6),
+    'aug': (0, 4, 8),
+    'sus2': (0, 2, 7),
+    'sus4': (0, 5, 7),
+    'maj7': (0, 4, 7, 11),
+    'min7': (0, 3, 7, 10),
+    '7': (0, 4, 7, 10),
+    'dim7': (0, 3, 6, 9),
+    'aug7': (0, 4, 8, 10),
+    'power': (0, 7),
+    'add9': (0, 4, 7, 14),
+    'maj9': (0, 4, 7, 11, 14),
+    'min9': (0, 3, 7, 10, 14),
+    '11': (0, 4, 7, 10, 14, 17),
+    '13': (0, 4, 7, 10, 14, 21),
+    '7b9': (0, 4, 7, 10, 13),
+    '7#9': (0, 4, 7, 10, 15),
+    '6': (0, 4, 7, 9),
+    'm6': (0, 3, 7, 9),
+    '6/9': (0, 4, 7, 9, 14),
+    'min7b5': (0, 3, 6, 10),
+    'none': (0,),
+}
+
+def event_beats(duration_name, augmentation):
+    """
+    Returns the exact length in crotchet beats of a rolled duration,
+    including the dot from the augmentation die.
+    """
+    return duration_beats[duration_name] * augmentation_factors[augmentation]
+
+# --- Random Streams ---
+
+def _derive_seed(entropy, spawn_key):
+    """
+    Mixes a root seed and a spawn key into an independent 256-bit seed.
+    """
+    material = repr((entropy, tuple(spawn_key))).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(material).digest(), "big")
+
+class Roller(random.Random):
+    """
+    A seedable random stream for rolling dice. Child streams made with
+    spawn() are independent of each other and of their parent, and are
+    fully determined by the root seed and their position in the spawn tree,
+    so work split across processes stays reproducible.
+    """
+    def __init__(self, seed=None, spawn_key=()):
+        if seed is None:
+            seed = secrets.randbits(128)
+        self.entropy = seed
+        self.spawn_key = tuple(spawn_key)
+        self.n_children_spawned = 0
+        super().__init__(_derive_seed(self.entropy, self.spawn_key))
+
+    def spawn(self, n):
+        """
+        Returns `n` new independent child Rollers. Calling spawn again
+        returns further children rather than repeating the first ones.
+        """
+        start = self.n_children_spawned
+        self.n_children_spawned += n
+        return [Roller(self.entropy, self.spawn_key + (i,)) for i in range(start, start + n)]
+
+    def __reduce__(self):
+        return (self.__class__, (self.entropy, self.spawn_key), (self.getstate(), self.n_children_spawned))
+
+    def __setstate__(self, state):
+        generator_state, self.n_children_spawned = state
+        self.setstate(generator_state)
+
+# --- Compiled Dice ---
+
+# Batches of at least this many rolls are sampled with NumPy when it is
+# installed; below it, setting up the NumPy generator costs more than it saves.
+NUMPY_MIN_BATCH = 128
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """
+    Returns the numpy module, or None if it is not installed. Imported on
+    first use so the headless roller starts without it.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def _build_alias_table(weights):
+    """
+    Builds the probability and alias tables for Walker's alias method
+    (Vose's variant), so a weighted face can be picked with one random number.
+    """
+    size = len(weights)
+    total = sum(weights)
+    scaled = [weight * size / total for weight in weights]
+    prob = [1.0] * size
+    alias = list(range(size))
+
+    small = [i for i, value in enumerate(scaled) if value < 1.0]
+    large = [i for i, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = (scaled[more] + scaled[less]) - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+    # Whatever is left over is 1.0 up to floating point error.
+    return tuple(prob), tuple(alias)
+
+class CompiledDie:
+    """
+    A die compiled once into a table of distinct faces with explicit weights.
+    Faces are identified by their integer code (their index in `faces`) and
+    sampled in O(1) with the alias method, without allocating per roll.
+    """
+    def __init__(self, faces, weights=None):
+        faces = tuple(faces)
+        if not faces:
+            raise ValueError("A die needs at least one face.")
+        if weights is None:
+            weights = (1,) * len(faces)
+        weights = tuple(weights)
+        if len(weights) != len(faces):
+            raise ValueError("A die needs exactly one weight per face.")
+        if any(not math.isfinite(weight) for weight in weights):
+            raise ValueError("Die weights must be finite numbers, not NaN or infinity.")
+        if any(weight < 0 for weight in weights) or sum(weights) <= 0:
+            raise ValueError("Die weights must be non-negative and not all zero.")
+        if len(set(faces)) != len(faces):
+            raise ValueError("Die faces must be distinct; use weights instead of repeats.")
+
+        self.faces = faces
+        self.weights = weights
+        self.codes = {face: code for code, face in enumerate(faces)}
+
+        total = sum(weights)
+        self.probabilities = tuple(weight / total for weight in weights)
+        self.cum_weights = tuple(itertools.accumulate(weights))
+        self.uniform = len(set(weights)) == 1
+        self.typecode = "B" if len(faces) <= 0x100 else "H"
+        self._prob, self._alias = _build_alias_table(weights)
+
+    @classmethod
+    def from_options(cls, die_options):
+        """
+        Compiles a die written the original way: a dict (its keys are the
+        faces) or a list, where repeated entries become a heavier weight.
+        """
+        if isinstance(die_options, dict):
+            return cls(die_options.keys())
+
+        weights = {}
+        for face in die_options:
+            weights[face] = weights.get(face, 0) + 1
+        return cls(weights.keys(), weights.values())
+
+    def __len__(self):
+        return len(self.faces)
+
+    def sample_code(self, rng=random):
+        """
+        Returns the integer code of one weighted random face.
+        """
+        u = rng.random() * len(self.faces)
+        code = int(u)
+        if u - code < self._prob[code]:
+            return code
+        return self._alias[code]
+
+    def sample(self, rng=random):
+        """
+        Returns one weighted random face.
+        """
+        return self.faces[self.sample_code(rng)]
+
+    def sample_codes(self, n, rng=random):
+        """
+        Returns an array of `n` weighted random face codes.
+
+        Large batches are drawn with NumPy when it is installed, from a
+        generator seeded by `rng`, so seeded batches are reproducible but
+        differ from those of a machine without NumPy.
+        """
+        size = len(self.faces)
+        if n >= NUMPY_MIN_BATCH and _numpy() is not None:
+            return self._sample_codes_numpy(n, rng)
+        if self.uniform:
+            return array(self.typecode, rng.choices(range(size), k=n))
+
+        rand = rng.random
+
+        prob = self._prob
+        alias = self._alias
+        codes = array(self.typecode)
+        append = codes.append
+        for _ in range(n):
+            u = rand() * size
+            code = int(u)
+            append(code if u - code < prob[code] else alias[code])
+        return codes
+
+    def _sample_codes_numpy(self, n, rng):
+        np = _numpy()
+        generator = np.random.default_rng(rng.getrandbits(128))
+        size = len(self.faces)
+        dtype = np.uint8 if self.typecode == "B" else np.uint16
+        if self.uniform:
+            drawn = generator.integers(0, size, n, dtype=dtype)
+        else:
+            tables = self.__dict__.get("_numpy_tables")
+            if tables is None:
+                tables = self._numpy_tables = (np.array(self._prob), np.array(self._alias, dtype=dtype))
+            prob, alias = tables
+            u = generator.random(n) * size
+            drawn = u.astype(np.intp)
+            drawn = np.where(u - drawn < prob[drawn], drawn, alias[drawn]).astype(dtype)
+        codes = array(self.typecode)
+        codes.frombytes(drawn.tobytes())
+        return codes
+
+# Compiled once at import; roll_die and roll_all_dice sample from these.
+duration_table = CompiledDie.from_options(duration_die)
+augmentation_table = CompiledDie.from_options(augmentation_die)
+pitch_table_12tet = CompiledDie.from_options(pitch_die_12tet)
+pitch_table_24tet = CompiledDie.from_options(pitch_die_24tet)
+chord_table = CompiledDie.from_options(chord_die)
+
+_compiled_dice = {
+    id(die_options): (die_options, table)
+    for die_options, table in (
+        (duration_die, duration_table),
+        (augmentation_die, augmentation_table),
+        (pitch_die_12tet, pitch_table_12tet),
+        (pitch_die_24tet, pitch_table_24tet),
+        (chord_die, chord_table),
+    )
+}
+
+def compile_die(die_options):
+    """
+    Returns the CompiledDie for a die, reusing the tables built at import
+    for the built-in dice.
+    """
+    if isinstance(die_options, CompiledDie):
+        return die_options
+    entry = _compiled_dice.get(id(die_options))
+    if entry is not None and entry[0] is die_options:
+        return entry[1]
+    return CompiledDie.from_options(die_options)
+
+# --- N-TET Pitch Dice ---
+
+# Equal divisions of the octave supported by pitch_table_for. Above 1200
+# steps, neighbouring pitches would be less than a cent apart.
+MAX_TET = 1200
+
+# Rolled pitches are placed in the octave from C4, with A4 this many cents above C4.
+A4_CENTS_ABOVE_C4 = 900
+DEFAULT_REFERENCE_A4 = 440.0
+
+def _check_tet(tet_choice):
+    if isinstance(tet_choice, bool) or not isinstance(tet_choice, int) or not 1 <= tet_choice <= MAX_TET:
+        raise ValueError(f"tet_choice must be a whole number of steps from 1 to {MAX_TET}, not {tet_choice!r}.")
+
+@functools.lru_cache(maxsize=None)
+def pitch_spelling_table(tet_choice):
+    """
+    Returns the pitch names for each step of `tet_choice`-tone equal
+    temperament, starting from C. 12 and 24 use the hand-written dice
+    above. Other divisions name each step after the nearest 12-TET note
+    and how many cents it is above or below it, e.g. "D-37¢".
+    Built on first use and memoized per division.
+    """
+    _check_tet(tet_choice)
+    if tet_choice == 12:
+        return tuple(pitch_die_12tet)
+    if tet_choice == 24:
+        return tuple(pitch_die_24tet)
+
+    names = []
+    for step in range(tet_choice):
+        cents = step * 1200 / tet_choice
+        semitone = round(cents / 100)
+        offset = round(cents - semitone * 100)
+        name = pitch_die_12tet[semitone % 12]
+        names.append(name if offset == 0 else f"{name}{offset:+d}¢")
+    return tuple(names)
+
+@functools.lru_cache(maxsize=None)
+def pitch_table_for(tet_choice):
+    """
+    Returns the compiled pitch die for `tet_choice`-tone equal temperament.
+    """
+    if tet_choice == 12:
+        return pitch_table_12tet
+    if tet_choice == 24:
+        return pitch_table_24tet
+    return CompiledDie(pitch_spelling_table(tet_choice))
+
+def pitch_cents(pitch, tet_choice):
+    """
+    Returns how many cents above C a rolled pitch name is.
+    """
+    return pitch_table_for(tet_choice).codes[pitch] * 1200 / tet_choice
+
+@functools.lru_cache(maxsize=64)
+def pitch_frequency_table(tet_choice, reference_a4=DEFAULT_REFERENCE_A4):
+    """
+    Returns the frequency in Hz of every step of `tet_choice`-TET in the
+    octave from C4, indexed by face code, tuned to `reference_a4`.
+    """
+    return array("d", (
+        reference_a4 * 2 ** ((step * 1200 / tet_choice - A4_CENTS_ABOVE_C4) / 1200)
+        for step in range(tet_choice)
+    ))
+
+def pitch_frequency(pitch, tet_choice, reference_a4=DEFAULT_REFERENCE_A4):
+    """
+    Returns the frequency in Hz of a rolled pitch name in the octave from C4.
+    """
+    return pitch_frequency_table(tet_choice, reference_a4)[pitch_table_for(tet_choice).codes[pitch]]
+
+def pitch_codes_to_frequencies(codes, tet_choice, reference_a4=DEFAULT_REFERENCE_A4):
+    """
+    Converts a whole column of pitch codes, such as a RollBatch's "pitch"
+    column, to an array of frequencies with one table lookup per roll.
+    Long columns are looked up in one go with NumPy when it is installed.
+    """
+    table = pitch_frequency_table(tet_choice, reference_a4)
+    np = _numpy() if len(codes) >= NUMPY_MIN_BATCH else None
+    if np is None:
+        return array("d", map(table.__getitem__, codes))
+    frequencies = array("d")
+    frequencies.frombytes(np.take(np.frombuffer(table, dtype=np.float64), np.asarray(codes, dtype=np.intp)).tobytes())
+    return frequencies
+
 # --- Rolling Functions ---
 
-def roll_die(die_options):
+def roll_die(die_options, rng=None):
     """
-    Takes a dictionary or list and returns a random key or item.
+    Takes a dictionary, list or CompiledDie and returns a random key or item.
+    Repeated list entries make that item proportionally more likely.
+    `rng` is an optional Roller; the global random module is used otherwise.
     """
-    if isinstance(die_options, dict):
-        # If it's a dictionary, we get its keys as a list and pick one.
-        return random.choice(list(die_options.keys()))
-    else:
-        # If it's not a dictionary (it should be a list in our current design),
-        # we pick directly from it.
-        return random.choice(die_options)
+    return compile_die(die_options).sample(rng or random)
 
-def roll_all_dice(tet_choice):
+def roll_all_dice(tet_choice, rng=None):
     """
     Rolls all the dice and returns a dictionary of the results.
-    `tet_choice` should be either 12 or 24.
+    `tet_choice` is the number of equal steps in the octave for the pitch
+    die, usually 12 or 24; see pitch_table_for.
+    `rng` is an optional Roller; the global random module is used otherwise.
     """
-    results = {
-        "duration": roll_die(duration_die),
-        "augmentation": roll_die(augmentation_die),
-        "chord": roll_die(chord_die)
+    rng = rng or random
+    return {
+        "duration": duration_table.sample(rng),
+        "augmentation": augmentation_table.sample(rng),
+        "chord": chord_table.sample(rng),
+        "pitch": pitch_table_for(tet_choice).sample(rng),
     }
 
-    if tet_choice == 24:
-        results["pitch"] = roll_die(pitch_die_24tet)
-    else:
-        results["pitch"] = roll_die(pitch_die_12tet)
-
-    return results
+def pitch_semitones(pitch, tet_choice):
+    """
+    Returns how many semitones above C a rolled pitch name is.
+    Quarter tones in 24-TET come out as halves.
+    """
+    return pitch_cents(pitch, tet_choice) / 100
 
 def get_duration_image_path(duration_name):
     """
     Returns the image path for a given duration name.
     """
     return duration_die.get(duration_name)
+
+
+# --- Batch Rolling ---
+
+# Order of the dice in a batch, matching the keys returned by roll_all_dice.
+BATCH_DICE = ("duration", "augmentation", "chord", "pitch")
+
+class RollBatch:
+    """
+    A columnar batch of rolls: one integer code array per die, plus the
+    label tables the codes index into. Dicts are only built when asked for.
+    The dice come in the order of `columns`, which is BATCH_DICE for the
+    built-in dice.
+    """
+    def __init__(self, tet_choice, columns, tables):
+        self.tet_choice = tet_choice
+        self.columns = columns
+        self.tables = tables
+        self.names = tuple(columns)
+
+    def __len__(self):
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def __getitem__(self, index):
+        return {name: self.tables[name][self.columns[name][index]] for name in self.names}
+
+    def __iter__(self):
+        """
+        Lazily yields each roll as a dict shaped like roll_all_dice's result.
+        """
+        names = self.names
+        tables = [self.tables[name] for name in names]
+        columns = [self.columns[name] for name in names]
+        for codes in zip(*columns):
+            yield {name: table[code] for name, table, code in zip(names, tables, codes)}
+
+    def labels(self, name):
+        """
+        Returns the column for one die decoded into its face labels.
+        """
+        table = self.tables[name]
+        return [table[code] for code in self.columns[name]]
+
+    def pitch_frequencies(self, reference_a4=DEFAULT_REFERENCE_A4):
+        """
+        Returns the rolled pitches as an array of frequencies in Hz.
+        """
+        if self.tables["pitch"] != pitch_spelling_table(self.tet_choice):
+            raise ValueError(f"This batch's pitch die is not the {self.tet_choice}-TET pitch die.")
+        return pitch_codes_to_frequencies(self.columns["pitch"], self.tet_choice, reference_a4)
+
+def roll_all_dice_batch(n, tet_choice, rng=None):
+    """
+    Rolls `n` complete results at once and returns them as a RollBatch.
+    Each die is sampled as a whole column of face codes from its compiled
+    table, so the distribution matches roll_all_dice.
+    `rng` is an optional Roller; the global random module is used otherwise.
+    """
+    rng = rng or random
+    compiled = {
+        "duration": duration_table,
+        "augmentation": augmentation_table,
+        "chord": chord_table,
+        "pitch": pitch_table_for(tet_choice),
+    }
+
+    columns = {name: compiled[name].sample_codes(n, rng) for name in BATCH_DICE}
+    tables = {name: compiled[name].faces for name in BATCH_DICE}
+    return RollBatch(tet_choice, columns, tables)
+
+
+# --- Sequences ---
+
+class MarkovDie:
+    """
+    A die whose next face depends on the face before it. Every row of the
+    transition table is compiled into its own CompiledDie, so each step is
+    one O(1) draw and constraints never need re-rolling: disallowed moves
+    simply have zero weight.
+
+    For example, a duration die that never plays two breves in a row:
+
+        MarkovDie.from_die(duration_die, allowed=lambda prev, face: not (prev == face == "breve"))
+    """
+    def __init__(self, faces, transitions, initial=None):
+        faces = tuple(faces)
+        if len(transitions) != len(faces):
+            raise ValueError("A Markov die needs one transition row per face.")
+
+        self.faces = faces
+        self.initial = CompiledDie(faces, initial)
+        self.rows = []
+        for face, row in zip(faces, transitions):
+            if len(row) != len(faces):
+                raise ValueError(f"The transition row for {face!r} needs one weight per face.")
+            # Rows with no way out are only a problem if the chain can reach them.
+            self.rows.append(CompiledDie(faces, row) if sum(row) > 0 else None)
+
+        reachable = set()
+        frontier = [code for code, weight in enumerate(self.initial.weights) if weight > 0]
+        while frontier:
+            code = frontier.pop()
+            if code in reachable:
+                continue
+            reachable.add(code)
+            if self.rows[code] is None:
+                raise ValueError(f"No face is allowed to follow {faces[code]!r}.")
+            frontier.extend(following for following, weight in enumerate(self.rows[code].weights) if weight > 0)
+
+        self.typecode = self.initial.typecode
+
+    @classmethod
+    def from_die(cls, die_options, transitions=None, allowed_faces=None, allowed=None):
+        """
+        Builds a Markov die over the faces of an existing die.
+
+        `transitions` maps a face to {next face: weight}; faces left out get
+        no weight. Without it every row uses the die's own weights, so the
+        rolls are independent apart from the constraints. `allowed_faces`
+        keeps the chain within a set of faces (such as the notes of a key),
+        and `allowed(previous, face)` rules out individual moves.
+        """
+        base = compile_die(die_options)
+        faces = base.faces
+
+        def face_allowed(face):
+            return allowed_faces is None or face in allowed_faces
+
+        rows = []
+        for previous in faces:
+            if transitions is None:
+                row = list(base.weights)
+            else:
+                following = transitions.get(previous, {})
+                row = [following.get(face, 0) for face in faces]
+            for code, face in enumerate(faces):
+                if not face_allowed(face) or (allowed is not None and not allowed(previous, face)):
+                    row[code] = 0
+            rows.append(row)
+
+        initial = [weight if face_allowed(face) else 0 for face, weight in zip(faces, base.weights)]
+        return cls(faces, rows, initial)
+
+    def sample_codes(self, n, rng=random, previous=None):
+        """
+        Returns an array of `n` face codes continuing on from the code
+        `previous`, or starting fresh from the initial weights if it is None.
+        """
+        rand = rng.random
+        size = len(self.faces)
+        tables = [(row._prob, row._alias) if row is not None else None for row in self.rows]
+
+        codes = array(self.typecode)
+        append = codes.append
+        code = previous
+        for _ in range(n):
+            if code is None:
+                code = self.initial.sample_code(rng)
+            else:
+                prob, alias = tables[code]
+                u = rand() * size
+                code_index = int(u)
+                code = code_index if u - code_index < prob[code_index] else alias[code_index]
+            append(code)
+        return codes
+
+class SequenceEngine:
+    """
+    Rolls whole sequences where each die can follow its own MarkovDie.
+    Dice without one are rolled independently as usual. The chains carry
+    on from one generate() call to the next, so long sequences can be made
+    in chunks.
+    """
+    def __init__(self, tet_choice=12, duration=None, augmentation=None, chord=None, pitch=None):
+        self.tet_choice = tet_choice
+        self.dice = {
+            "duration": duration or MarkovDie.from_die(duration_table),
+            "augmentation": augmentation or MarkovDie.from_die(augmentation_table),
+            "chord": chord or MarkovDie.from_die(chord_table),
+            "pitch": pitch or MarkovDie.from_die(pitch_table_for(tet_choice)),
+        }
+        self._previous = dict.fromkeys(BATCH_DICE)
+
+    def reset(self):
+        """
+        Forgets the last faces, so the next sequence starts afresh.
+        """
+        self._previous = dict.fromkeys(BATCH_DICE)
+
+    def generate(self, n, rng=None):
+        """
+        Rolls the next `n` steps of the sequence and returns them as a RollBatch.
+        """
+        rng = rng or random
+        columns = {}
+        for name in BATCH_DICE:
+            codes = self.dice[name].sample_codes(n, rng, self._previous[name])
+            if codes:
+                self._previous[name] = codes[-1]
+            columns[name] = codes
+        tables = {name: self.dice[name].faces for name in BATCH_DICE}
+        return RollBatch(self.tet_choice, columns, tables)
+
+if __name__ == "__main__":
+    # `python -m dice` runs the headless command-line roller. Registering
+    # this module as `dice` stops cli's `import dice` from loading the
+    # engine a second time.
+    import sys
+    sys.modules.setdefault("dice", sys.modules[__name__])
+    import cli
+    sys.exit(cli.main())
@@ -0,0 +1,333 @@
+"""
+User-defined dice sets, loaded from a TOML or JSON file.
+
+A dice set lists its dice in the order they are shown. Each die is either
+one of the built-in dice or a table of faces, optionally weighted:
+
+    name = "Dynamics and articulation"
+
+    [[dice]]
+    builtin = "duration"        # duration, augmentation, chord, pitch,
+                                # pitch_12tet or pitch_24tet
+
+    [[dice]]
+    name = "dynamics"
+    label = "Dynamics:"         # optional, defaults to "Dynamics:"
+    faces = ["pp", "p", "mp", "mf", "f", "ff"]
+    weights = [1, 2, 3, 3, 2, 1]  # optional, defaults to all equal
+
+    [[dice]]
+    name = "articulation"
+    faces = { staccato = 3, legato = 2, accent = 1 }  # face = weight
+
+The built-in "pitch" die follows the TET chosen when rolling. Files are
+validated once; the validated faces and weights are cached as plain JSON
+under a hash of the file's contents, so loading the same file again skips
+parsing and validation and only rebuilds the sampling tables.
+"""
+import hashlib
+import json
+import os
+import random
+import sys
+
+import dice # Import our dice logic from dice.py
+
+# Bump when the cached data written by _dice_set_to_cache changes shape,
+# so stale caches are ignored.
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "chance-music-dice", "dicesets")
+
+class DiceSetError(ValueError):
+    """
+    Raised when a dice set file cannot be read or is not valid.
+    """
+
+# --- Dice Sets ---
+
+# Built-in dice a set can refer to, with how the GUI shows them.
+BUILTIN_DICE = {
+    "duration": ("Duration:", "image"),
+    "augmentation": ("Augmentation:", "text"),
+    "chord": ("Chord:", "text"),
+    "pitch": ("Pitch:", "pitch"),
+    "pitch_12tet": ("Pitch:", "pitch"),
+    "pitch_24tet": ("Pitch:", "pitch"),
+}
+
+class DieSpec:
+    """
+    One die of a dice set: its name, display label, how it is drawn
+    ("text", "pitch" or "image") and its compiled table.
+    """
+    def __init__(self, name, label, table=None, kind="text", images=None, builtin=None):
+        self.name = name
+        self.label = label
+        self.kind = kind
+        self.images = images or {}
+        self.builtin = builtin
+        self._table = table
+
+    def table_for(self, tet_choice):
+        """
+        Returns the CompiledDie to roll, which for the built-in pitch die
+        depends on the TET.
+        """
+        if self.builtin == "pitch":
+            return dice.pitch_table_for(tet_choice)
+        if self.builtin is not None:
+            return _builtin_table(self.builtin)
+        return self._table
+
+    def image_path(self, face):
+        """
+        Returns the image file for a face, or None if it is drawn as text.
+        """
+        if self.builtin == "duration":
+            return dice.get_duration_image_path(face)
+        return self.images.get(face)
+
+def _builtin_table(builtin):
+    return {
+        "duration": dice.duration_table,
+        "augmentation": dice.augmentation_table,
+        "chord": dice.chord_table,
+        "pitch_12tet": dice.pitch_table_12tet,
+        "pitch_24tet": dice.pitch_table_24tet,
+    }[builtin]
+
+class DiceSet:
+    """
+    An ordered set of dice that are rolled together.
+    """
+    def __init__(self, name, dice_specs):
+        self.name = name
+        self.dice = list(dice_specs)
+        self.names = tuple(spec.name for spec in self.dice)
+
+    def __len__(self):
+        return len(self.dice)
+
+    def has_builtin(self, name, tet_choice=12):
+        """
+        Returns whether the die called `name` rolls the faces of the built-in
+        die of that name at `tet_choice`, so code that reads its faces as
+        durations, dots, chords or pitches can rely on them. A custom die
+        that just happens to be called "duration", or a pitch_24tet die
+        rolled for 12-TET, does not count.
+        """
+        builtin_tables = {
+            "duration": dice.duration_table,
+            "augmentation": dice.augmentation_table,
+            "chord": dice.chord_table,
+            "pitch": dice.pitch_table_for(tet_choice),
+        }
+        for spec in self.dice:
+            if spec.name == name:
+                return name in builtin_tables and spec.table_for(tet_choice) is builtin_tables[name]
+        return False
+
+    def roll(self, tet_choice=12, rng=None):
+        """
+        Rolls every die once and returns {die name: face}.
+        """
+        rng = rng or random
+        return {spec.name: spec.table_for(tet_choice).sample(rng) for spec in self.dice}
+
+    def roll_batch(self, n, tet_choice=12, rng=None):
+        """
+        Rolls `n` results at once and returns them as a dice.RollBatch.
+        """
+        rng = rng or random
+        tables = {spec.name: spec.table_for(tet_choice) for spec in self.dice}
+        columns = {name: table.sample_codes(n, rng) for name, table in tables.items()}
+        return dice.RollBatch(tet_choice, columns, {name: table.faces for name, table in tables.items()})
+
+def default_dice_set():
+    """
+    Returns the four standard dice in the order the GUI shows them.
+    """
+    return DiceSet("Chance Music Dice", [
+        _builtin_spec("duration"),
+        _builtin_spec("pitch"),
+        _builtin_spec("chord"),
+        _builtin_spec("augmentation"),
+    ])
+
+def _builtin_spec(builtin, name=None, label=None):
+    default_label, kind = BUILTIN_DICE[builtin]
+    name = name or ("pitch" if builtin.startswith("pitch") else builtin)
+    return DieSpec(name, label or default_label, kind=kind, builtin=builtin)
+
+# --- Validation and Compilation ---
+
+def _compile_die(entry, index, base_dir):
+    where = f"die {index + 1}"
+    if not isinstance(entry, dict):
+        raise DiceSetError(f"{where}: expected a table of settings.")
+
+    unknown = set(entry) - {"name", "label", "builtin", "faces", "weights", "images"}
+    if unknown:
+        raise DiceSetError(f"{where}: unknown setting(s) {', '.join(sorted(unknown))}.")
+
+    name = entry.get("name")
+    label = entry.get("label")
+    if name is not None and (not isinstance(name, str) or not name.strip()):
+        raise DiceSetError(f"{where}: 'name' must be a non-empty string.")
+    if label is not None and not isinstance(label, str):
+        raise DiceSetError(f"{where}: 'label' must be a string.")
+
+    builtin = entry.get("builtin")
+    if builtin is not None:
+        if builtin not in BUILTIN_DICE:
+            raise DiceSetError(f"{where}: unknown builtin {builtin!r}; expected one of {', '.join(BUILTIN_DICE)}.")
+        if "faces" in entry or "weights" in entry or "images" in entry:
+            raise DiceSetError(f"{where}: a builtin die cannot also set faces, weights or images.")
+        return _builtin_spec(builtin, name, label)
+
+    if name is None:
+        raise DiceSetError(f"{where}: needs a 'name' (or a 'builtin').")
+    where = f"die {name!r}"
+
+    faces = entry.get("faces")
+    weights = entry.get("weights")
+    if isinstance(faces, dict):
+        if weights is not None:
+            raise DiceSetError(f"{where}: give weights either in 'faces' or in 'weights', not both.")
+        faces, weights = list(faces.keys()), list(faces.values())
+    if not isinstance(faces, list) or not faces:
+        raise DiceSetError(f"{where}: 'faces' must be a non-empty list or a table of face = weight.")
+    if any(not isinstance(face, (str, int, float)) or isinstance(face, bool) for face in faces):
+        raise DiceSetError(f"{where}: faces must be strings or numbers.")
+    faces = [str(face) for face in faces]
+    if weights is not None and (
+        not isinstance(weights, list)
+        or any(not isinstance(weight, (int, float)) or isinstance(weight, bool) for weight in weights)
+    ):
+        raise DiceSetError(f"{where}: 'weights' must be a list of numbers.")
+
+    try:
+        table = dice.CompiledDie(faces, weights)
+    except ValueError as e:
+        raise DiceSetError(f"{where}: {e}") from None
+
+    images = entry.get("images", {})
+    if not isinstance(images, dict) or any(face not in table.codes for face in images):
+        raise DiceSetError(f"{where}: 'images' must map faces of this die to image files.")
+    images = {face: os.path.normpath(os.path.join(base_dir, path)) for face, path in images.items()}
+
+    return DieSpec(name, label or f"{name.replace('_', ' ').title()}:", table,
+                   kind="image" if images else "text", images=images)
+
+def compile_dice_set(data, base_dir="."):
+    """
+    Validates parsed dice set data and compiles it into a DiceSet.
+    Relative image paths are resolved against `base_dir`.
+    """
+    if not isinstance(data, dict):
+        raise DiceSetError("A dice set must be a table with a 'dice' list.")
+    entries = data.get("dice")
+    if not isinstance(entries, list) or not entries:
+        raise DiceSetError("A dice set needs a non-empty 'dice' list.")
+
+    specs = [_compile_die(entry, index, base_dir) for index, entry in enumerate(entries)]
+    seen = set()
+    for spec in specs:
+        if spec.name in seen:
+            raise DiceSetError(f"Two dice are both named {spec.name!r}.")
+        seen.add(spec.name)
+    return DiceSet(str(data.get("name", "Custom Dice")), specs)
+
+def _parse(raw, path):
+    if path.lower().endswith(".json"):
+        loads = json.loads
+    else:
+        try:
+            import tomllib # Only in Python 3.11 and later
+        except ImportError:
+            raise DiceSetError(f"Could not read {path}: TOML dice sets need Python 3.11 or later. "
+                               f"Save the dice set as .json instead.") from None
+        loads = tomllib.loads
+    try:
+        return loads(raw.decode("utf-8"))
+    except ValueError as e:
+        # UnicodeDecodeError, json.JSONDecodeError and tomllib.TOMLDecodeError
+        raise DiceSetError(f"Could not parse {path}: {e}") from None
+
+def _dice_set_to_cache(dice_set):
+    """
+    Returns a dice set as plain data for the cache: each die's settings and,
+    unless it is built in, its faces and weights.
+    """
+    return {
+        "name": dice_set.name,
+        "dice": [
+            {
+                "name": spec.name,
+                "label": spec.label,
+                "kind": spec.kind,
+                "builtin": spec.builtin,
+                "faces": None if spec.builtin else list(spec.table_for(12).faces),
+                "weights": None if spec.builtin else list(spec.table_for(12).weights),
+                "images": spec.images,
+            }
+            for spec in dice_set.dice
+        ],
+    }
+
+def _dice_set_from_cache(data):
+    """
+    Rebuilds a DiceSet, compiling its sampling tables, from _dice_set_to_cache data.
+    """
+    return DiceSet(data["name"], [
+        DieSpec(
+            entry["name"],
+            entry["label"],
+            None if entry["builtin"] else dice.CompiledDie(entry["faces"], entry["weights"]),
+            kind=entry["kind"],
+            images=entry["images"],
+            builtin=entry["builtin"],
+        )
+        for entry in data["dice"]
+    ])
+
+def load_dice_set(path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Loads a dice set from a .toml or .json file.
+
+    The validated set is cached in `cache_dir` under a hash of the file's
+    contents and location, and reused while the file is unchanged. Pass
+    cache_dir=None to always parse and validate the file.
+    """
+    path = os.path.abspath(path)
+    try:
+        with open(path, "rb") as fp:
+            raw = fp.read()
+    except OSError as e:
+        raise DiceSetError(f"Could not read {path}: {e}") from None
+
+    cache_path = None
+    if cache_dir is not None:
+        digest = hashlib.sha256(f"{CACHE_FORMAT_VERSION}\0{path}\0".encode("utf-8") + raw).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{digest}.json")
+        try:
+            with open(cache_path, "r", encoding="utf-8") as fp:
+                return _dice_set_from_cache(json.load(fp))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable dice set cache {cache_path}: {e}", file=sys.stderr)
+
+    dice_set = compile_dice_set(_parse(raw, path), os.path.dirname(path))
+
+    if cache_path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as fp:
+                json.dump(_dice_set_to_cache(dice_set), fp, ensure_ascii=False)
+            os.replace(temporary_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write dice set cache {cache_path}: {e}", file=sys.stderr)
+    return dice_set
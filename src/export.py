@@ -0,0 +1,178 @@
+import csv
+import itertools
+import json
+import struct
+
+import dice # Import our dice logic from dice.py
+
+# Rolls are generated and written this many at a time, so memory use stays
+# the same however long the piece is.
+DEFAULT_CHUNK_SIZE = 10_000
+
+# --- Roll Streams ---
+
+def iter_rolls(count=None, tet_choice=12, rng=None, chunk_size=DEFAULT_CHUNK_SIZE, dice_set=None):
+    """
+    Yields roll dicts shaped like dice.roll_all_dice's result, or keyed by
+    the dice of `dice_set` if one is given.
+    `count` of None keeps rolling forever. Rolls are drawn in batches of
+    `chunk_size` behind the scenes but handed out one at a time.
+    """
+    remaining = count
+    while remaining is None or remaining > 0:
+        n = chunk_size if remaining is None else min(chunk_size, remaining)
+        if dice_set is None:
+            yield from dice.roll_all_dice_batch(n, tet_choice, rng)
+        else:
+            yield from dice_set.roll_batch(n, tet_choice, rng)
+        if remaining is not None:
+            remaining -= n
+
+def _chunks(rolls, chunk_size):
+    rolls = iter(rolls)
+    while True:
+        chunk = list(itertools.islice(rolls, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+# --- Text Formats ---
+
+def write_jsonl(rolls, fp, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Writes one JSON object per line to the text file `fp`.
+    Returns the number of rolls written.
+    """
+    written = 0
+    for chunk in _chunks(rolls, chunk_size):
+        fp.write("".join(json.dumps(roll, ensure_ascii=False) + "\n" for roll in chunk))
+        written += len(chunk)
+    return written
+
+def write_csv(rolls, fp, chunk_size=DEFAULT_CHUNK_SIZE, fieldnames=None):
+    """
+    Writes the rolls as CSV with a header row to the text file `fp`, which
+    should be opened with newline="". The columns are `fieldnames`, or the
+    keys of the first roll. Returns the number of rolls written.
+    """
+    writer = None
+    written = 0
+    for chunk in _chunks(rolls, chunk_size):
+        if writer is None:
+            writer = csv.DictWriter(fp, fieldnames=fieldnames or list(chunk[0]))
+            writer.writeheader()
+        writer.writerows(chunk)
+        written += len(chunk)
+    if writer is None:
+        csv.DictWriter(fp, fieldnames=fieldnames or dice.BATCH_DICE).writeheader()
+    return written
+
+# --- Standard MIDI File ---
+
+MIDI_TICKS_PER_CROTCHET = 480
+MIDI_ROOT_NOTE = 60 # Rolled pitches are placed in the octave above middle C
+MIDI_BEND_RANGE = 2 # Pitch bend range in semitones, set on the channel via RPN 0
+MIDI_VELOCITY = 80
+
+def _vlq(value):
+    """
+    Encodes a MIDI variable-length quantity.
+    """
+    out = bytearray([value & 0x7F])
+    value >>= 7
+    while value:
+        out.insert(0, (value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(out)
+
+def _midi_event_bytes(roll, tet_choice, channel):
+    """
+    Returns the bytes for one roll: pitch bend, chord note-ons, then
+    note-offs after the dotted duration.
+    """
+    ticks = int(dice.event_beats(roll["duration"], roll["augmentation"]) * MIDI_TICKS_PER_CROTCHET)
+    semitones = dice.pitch_semitones(roll["pitch"], tet_choice)
+    root = MIDI_ROOT_NOTE + int(semitones)
+    bend = 8192 + round((semitones - int(semitones)) / MIDI_BEND_RANGE * 8192)
+    bend = min(bend, 16383)
+    notes = [root + interval for interval in dice.chord_intervals.get(roll["chord"], (0,))]
+    notes = [note for note in notes if 0 <= note <= 127]
+
+    out = bytearray()
+    out += b"\x00" + bytes([0xE0 | channel, bend & 0x7F, bend >> 7])
+    for note in notes:
+        out += b"\x00" + bytes([0x90 | channel, note, MIDI_VELOCITY])
+    for i, note in enumerate(notes):
+        out += _vlq(ticks if i == 0 else 0) + bytes([0x80 | channel, note, 0])
+    return out
+
+def write_midi(rolls, fp, tet_choice=12, tempo_bpm=120, channel=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Writes the rolls as a single-track Standard MIDI File to the binary
+    file `fp`, which must be seekable so the track length can be filled in
+    once everything has been streamed out. Returns the number of rolls written.
+
+    Durations and dots become ticks at MIDI_TICKS_PER_CROTCHET, the pitch
+    die picks the root note plus a pitch bend for quarter tones, and the
+    chord die picks the voicing from dice.chord_intervals.
+    """
+    fp.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, MIDI_TICKS_PER_CROTCHET))
+    length_offset = fp.tell() + 4
+    fp.write(b"MTrk" + struct.pack(">I", 0))
+
+    setup = bytearray()
+    tempo = round(60_000_000 / tempo_bpm)
+    setup += b"\x00\xFF\x51\x03" + tempo.to_bytes(3, "big")
+    for controller, value in ((101, 0), (100, 0), (6, MIDI_BEND_RANGE), (38, 0)):
+        setup += b"\x00" + bytes([0xB0 | channel, controller, value])
+    fp.write(setup)
+    track_length = len(setup)
+
+    written = 0
+    for chunk in _chunks(rolls, chunk_size):
+        data = b"".join(_midi_event_bytes(roll, tet_choice, channel) for roll in chunk)
+        fp.write(data)
+        track_length += len(data)
+        written += len(chunk)
+
+    fp.write(b"\x00\xFF\x2F\x00")
+    track_length += 4
+    end = fp.tell()
+    fp.seek(length_offset)
+    fp.write(struct.pack(">I", track_length))
+    fp.seek(end)
+    return written
+
+# --- Files ---
+
+EXPORT_FORMATS = ("jsonl", "csv", "midi", "wav")
+
+def export_rolls(path, export_format, count, tet_choice=12, rng=None, chunk_size=DEFAULT_CHUNK_SIZE, dice_set=None):
+    """
+    Rolls `count` results, from the built-in dice or from `dice_set`, and
+    streams them straight into a file at `path` in one of EXPORT_FORMATS.
+    MIDI and WAV need a dice set that includes all four built-in dice, its
+    pitch die matching `tet_choice`, and WAV needs NumPy. Returns the number of rolls written.
+    """
+    if export_format in ("midi", "wav") and dice_set is not None and not all(
+        dice_set.has_builtin(name, tet_choice) for name in dice.BATCH_DICE
+    ):
+        raise ValueError(f"{export_format.upper()} export needs the built-in {', '.join(dice.BATCH_DICE)} dice "
+                         f"in the dice set, with the pitch die matching {tet_choice}-TET.")
+    rolls = iter_rolls(count, tet_choice, rng, chunk_size, dice_set)
+    if export_format == "jsonl":
+        with open(path, "w", encoding="utf-8") as fp:
+            return write_jsonl(rolls, fp, chunk_size)
+    if export_format == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as fp:
+            return write_csv(rolls, fp, chunk_size)
+    if export_format == "midi":
+        with open(path, "wb") as fp:
+            return write_midi(rolls, fp, tet_choice, chunk_size=chunk_size)
+    if export_format == "wav":
+        try:
+            import audio
+        except ImportError as e:
+            raise ValueError(f"WAV export needs NumPy ({e}).") from None
+        return audio.render_wav(rolls, path, tet_choice)
+    raise ValueError(f"Unknown export format: {export_format!r}. Expected one of {', '.join(EXPORT_FORMATS)}.")
@@ -0,0 +1,63 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import dice # Import our dice logic from dice.py
+
+# Rolls per shard. Each shard gets its own Roller, so for a given seed the
+# output depends only on this and the total, never on the number of workers.
+DEFAULT_CHUNK_SIZE = 100_000
+
+def _roll_shard(n, tet_choice, roller):
+    """
+    Worker entry point: rolls one shard with its own generator.
+    """
+    return dice.roll_all_dice_batch(n, tet_choice, roller)
+
+def _shard_sizes(total, chunk_size):
+    full, remainder = divmod(total, chunk_size)
+    sizes = [chunk_size] * full
+    if remainder:
+        sizes.append(remainder)
+    return sizes
+
+def roll_farm(total, tet_choice, seed=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, max_pending=None):
+    """
+    Rolls `total` results across a process pool and yields them as
+    RollBatch shards in a fixed order.
+
+    Shard i is rolled with child i of Roller(seed), so the same seed and
+    chunk size always give the same output whatever `workers` is. At most
+    `max_pending` shards (default: two per worker) are in flight or waiting
+    to be consumed at once, which keeps memory bounded for huge totals.
+    """
+    if total < 0:
+        raise ValueError("total must not be negative.")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive.")
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    root = dice.Roller(seed)
+    sizes = iter(_shard_sizes(total, chunk_size))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for size in sizes:
+            pending.append(pool.submit(_roll_shard, size, tet_choice, root.spawn(1)[0]))
+            if len(pending) >= max_pending:
+                break
+
+        while pending:
+            batch = pending.popleft().result()
+            size = next(sizes, None)
+            if size is not None:
+                pending.append(pool.submit(_roll_shard, size, tet_choice, root.spawn(1)[0]))
+            yield batch
+
+def iter_farm_rolls(total, tet_choice, **kwargs):
+    """
+    Like roll_farm, but yields one result dict per roll.
+    """
+    for batch in roll_farm(total, tet_choice, **kwargs):
+        yield from batch
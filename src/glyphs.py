@@ -0,0 +1,363 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw, ImageFont, ImageTk
+
+import resources # Shared bounded cache for fonts, measurements and images
+
+# Target sizes are rounded down to a multiple of this many pixels, so a
+# window drag reuses a handful of renders instead of making one per pixel.
+SIZE_BUCKET_STEP = 16
+
+# Images smaller than this on either side are scaled back up to it.
+MIN_GLYPH_DIMENSION = 60
+
+class DurationGlyphAtlas:
+    """
+    Decodes each duration image once and serves resized copies of it from
+    quantized size buckets.
+
+    Resized Pillow images are rendered off the UI thread where possible and
+    kept for the `max_buckets` most recently used buckets; the Tk PhotoImages
+    made from them are held as "image" entries of a resources.ResourceCache,
+    which may be shared with the rest of the GUI and keeps at most
+    `max_photos` of them. PhotoImages are only ever created on the thread
+    that calls get(), which must be the Tk thread.
+    """
+    def __init__(self, image_paths, bucket_step=SIZE_BUCKET_STEP, max_photos=None, cache=None, max_buckets=4):
+        self.image_paths = list(image_paths)
+        self.bucket_step = bucket_step
+        self.max_buckets = max_buckets
+        self.cache = cache if cache is not None else resources.ResourceCache()
+        if max_photos is not None:
+            self.cache.limits["image"] = max_photos
+
+        self.hits = 0
+        self.misses = 0
+
+        self._sources = {}
+        self._rendered = OrderedDict() # bucket -> {image path: Pillow image}
+        self._pending_buckets = set()
+        self._lock = threading.Lock()
+
+    # --- Decoding and Rendering (safe off the UI thread) ---
+
+    def _source(self, image_path):
+        with self._lock:
+            source = self._sources.get(image_path)
+        if source is not None:
+            return source
+
+        with Image.open(image_path) as opened:
+            source = opened.convert("RGBA")
+        with self._lock:
+            return self._sources.setdefault(image_path, source)
+
+    def decode_all(self):
+        """
+        Decodes every known image. Missing or broken files are reported and skipped.
+        """
+        for image_path in self.image_paths:
+            try:
+                self._source(image_path)
+            except FileNotFoundError:
+                print(f"Error: Image not found at {image_path}. Check your --add-data path in PyInstaller for assets.")
+            except Exception as e:
+                print(f"An unexpected error occurred while loading image {image_path}: {e}")
+
+    @property
+    def max_photos(self):
+        return self.cache.limits.get("image")
+
+    def bucket_for(self, target_width, target_height):
+        """
+        Rounds a target box down to its size bucket.
+        """
+        step = self.bucket_step
+        width = max(step, int(target_width) // step * step)
+        height = max(step, int(target_height) // step * step)
+        return width, height
+
+    def _render(self, image_path, bucket):
+        with self._lock:
+            images = self._rendered.get(bucket)
+            rendered = images.get(image_path) if images is not None else None
+            if rendered is not None:
+                self._rendered.move_to_end(bucket)
+        if rendered is not None:
+            return rendered
+
+        source = self._source(image_path)
+        target_width, target_height = bucket
+        original_width, original_height = source.size
+
+        ratio = min(target_width / max(1, original_width), target_height / max(1, original_height))
+        new_width = int(original_width * ratio)
+        new_height = int(original_height * ratio)
+
+        if new_width < MIN_GLYPH_DIMENSION or new_height < MIN_GLYPH_DIMENSION:
+            scale_up_ratio = max(MIN_GLYPH_DIMENSION / max(1, new_width), MIN_GLYPH_DIMENSION / max(1, new_height))
+            new_width = int(new_width * scale_up_ratio)
+            new_height = int(new_height * scale_up_ratio)
+
+        new_width = max(1, min(new_width, target_width))
+        new_height = max(1, min(new_height, target_height))
+
+        rendered = source.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        with self._lock:
+            images = self._rendered.setdefault(bucket, {})
+            self._rendered.move_to_end(bucket)
+            while len(self._rendered) > self.max_buckets:
+                self._rendered.popitem(last=False)
+            return images.setdefault(image_path, rendered)
+
+    def render(self, image_path, target_width, target_height):
+        """
+        Returns the Pillow image fitted into the target box's size bucket.
+        Safe to call off the UI thread.
+        """
+        return self._render(image_path, self.bucket_for(target_width, target_height))
+
+    def prerender_bucket(self, bucket):
+        """
+        Renders every known image at one size bucket.
+        """
+        try:
+            for image_path in self.image_paths:
+                try:
+                    self._render(image_path, bucket)
+                except Exception as e:
+                    print(f"An unexpected error occurred while rendering image {image_path}: {e}")
+        finally:
+            with self._lock:
+                self._pending_buckets.discard(bucket)
+
+    def prerender_async(self, buckets=()):
+        """
+        Decodes all images and renders the given buckets on a daemon thread.
+        """
+        buckets = [bucket for bucket in buckets if self._claim_bucket(bucket)]
+
+        def work():
+            self.decode_all()
+            for bucket in buckets:
+                self.prerender_bucket(bucket)
+
+        thread = threading.Thread(target=work, name="glyph-atlas", daemon=True)
+        thread.start()
+        return thread
+
+    def _claim_bucket(self, bucket):
+        with self._lock:
+            if bucket in self._pending_buckets:
+                return False
+            images = self._rendered.get(bucket, {})
+            if all(image_path in images for image_path in self.image_paths):
+                return False
+            self._pending_buckets.add(bucket)
+            return True
+
+    # --- PhotoImages (Tk thread only) ---
+
+    def get(self, image_path, target_width, target_height):
+        """
+        Returns a PhotoImage of the image fitted into the target box's size
+        bucket, or None if it cannot be loaded. The first request for a new
+        bucket also queues the other images at that bucket in the background.
+        """
+        if target_width <= 0 or target_height <= 0:
+            return None
+
+        bucket = self.bucket_for(target_width, target_height)
+        key = ("image", image_path, bucket)
+        photo = self.cache.get(key)
+        if photo is not None:
+            self.hits += 1
+            return photo
+
+        self.misses += 1
+        try:
+            rendered = self._render(image_path, bucket)
+        except FileNotFoundError:
+            print(f"Error: Image not found at {image_path}. Check your --add-data path in PyInstaller for assets.")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred while loading image {image_path}: {e}")
+            return None
+
+        if image_path in self.image_paths:
+            self.prerender_async([bucket])
+
+        return self.cache.put(key, ImageTk.PhotoImage(rendered))
+
+# --- Pre-rendered Die Faces ---
+
+# Die drawing, matching the canvas shapes drawn in gui.py.
+DIE_SHADOW_OFFSET = 5
+DIE_CORNER_RADIUS = 15
+DIE_FILL = "#FFFFFF"
+DIE_OUTLINE = "#A0A8B4"
+DIE_SHADOW_FILL = "#D0D3DB"
+DIE_LABEL_FILL = "#555555"
+DIE_VALUE_FILL = "#333333"
+
+# Bundled fonts under assets/fonts. Characters listed here are drawn in
+# their own font; everything else uses the text font.
+TEXT_FONT_FILE = "NotoSans-VariableFont_wdth,wght.ttf"
+CHAR_FONT_FILES = {
+    "ⵐ": "NotoSansTifinagh-Regular.ttf",
+    "⩨": "NotoSansMath-Regular.ttf",
+}
+
+class DieFaceAtlas:
+    """
+    Renders whole die faces (shadow, rounded body, label and rolled value)
+    as bitmaps with Pillow and the bundled fonts, so that showing a roll is
+    one image swap per die, and the text looks the same whether or not the
+    fonts are installed on the system.
+
+    Faces are rendered per size bucket, all at once on a background thread
+    when a bucket is first laid out. The Pillow renders of the most recent
+    `max_buckets` buckets are kept; PhotoImages are made on the Tk thread
+    in get() and held as "face" entries of the shared cache.
+    """
+    def __init__(self, fonts_dir, label_size, value_size, glyph_atlas=None,
+                 bucket_step=SIZE_BUCKET_STEP, max_buckets=2, cache=None):
+        self.fonts_dir = fonts_dir
+        self.label_size = label_size
+        self.value_size = value_size
+        self.glyph_atlas = glyph_atlas
+        self.bucket_step = bucket_step
+        self.max_buckets = max_buckets
+        self.cache = cache if cache is not None else resources.ResourceCache()
+
+        self.hits = 0
+        self.misses = 0
+
+        self._fonts = {}
+        self._rendered = OrderedDict() # bucket -> {face key: Pillow image}
+        self._pending_buckets = set()
+        self._lock = threading.Lock()
+        # FreeType font objects are not safe to use from two threads at once.
+        self._render_lock = threading.Lock()
+
+    def bucket_for(self, die_width, die_height):
+        """
+        Rounds a die's size down to its size bucket.
+        """
+        step = self.bucket_step
+        return max(step, int(die_width) // step * step), max(step, int(die_height) // step * step)
+
+    # --- Rendering (safe off the UI thread) ---
+
+    def _font(self, filename, size):
+        key = (filename, size)
+        font = self._fonts.get(key)
+        if font is None:
+            font = ImageFont.truetype(os.path.join(self.fonts_dir, filename), size)
+            if filename == TEXT_FONT_FILE:
+                try:
+                    font.set_variation_by_name("Bold")
+                except (OSError, ValueError):
+                    pass # Pillow built without variable font support; regular weight will do.
+            self._fonts[key] = font
+        return font
+
+    def _runs(self, text, size):
+        """
+        Splits text into (text, font) runs by the font each character needs.
+        """
+        runs = []
+        for char in text:
+            filename = CHAR_FONT_FILES.get(char, TEXT_FONT_FILE)
+            if runs and runs[-1][0] == filename:
+                runs[-1][1].append(char)
+            else:
+                runs.append((filename, [char]))
+        return [("".join(chars), self._font(filename, size)) for filename, chars in runs]
+
+    def _draw_text(self, draw, text, size, center_x, center_y, fill):
+        runs = self._runs(text, size)
+        x = center_x - sum(font.getlength(run) for run, font in runs) / 2
+        for run, font in runs:
+            draw.text((x, center_y), run, font=font, fill=fill, anchor="lm")
+            x += font.getlength(run)
+
+    def _render_face(self, bucket, label, value, image_path):
+        width, height = bucket
+        face = Image.new("RGBA", (width + DIE_SHADOW_OFFSET, height + DIE_SHADOW_OFFSET), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(face)
+        draw.rounded_rectangle((DIE_SHADOW_OFFSET, DIE_SHADOW_OFFSET, width + DIE_SHADOW_OFFSET - 1, height + DIE_SHADOW_OFFSET - 1),
+                               radius=DIE_CORNER_RADIUS, fill=DIE_SHADOW_FILL)
+        draw.rounded_rectangle((0, 0, width - 1, height - 1), radius=DIE_CORNER_RADIUS,
+                               fill=DIE_FILL, outline=DIE_OUTLINE, width=2)
+
+        self._draw_text(draw, label, self.label_size, width / 2, 20, DIE_LABEL_FILL)
+        glyph = None
+        if image_path and self.glyph_atlas is not None:
+            try:
+                glyph = self.glyph_atlas.render(image_path, width * 0.8, height * 0.8).convert("RGBA")
+            except Exception as e:
+                print(f"An unexpected error occurred while loading image {image_path}: {e}")
+        if glyph is not None:
+            face.alpha_composite(glyph, ((width - glyph.width) // 2, (height - glyph.height) // 2))
+        elif value:
+            self._draw_text(draw, value, self.value_size, width / 2, height / 2 + 10, DIE_VALUE_FILL)
+        return face
+
+    def _rendered_face(self, bucket, face_key):
+        with self._lock:
+            faces = self._rendered.get(bucket)
+            rendered = faces.get(face_key) if faces is not None else None
+        if rendered is not None:
+            return rendered
+        with self._render_lock:
+            rendered = self._render_face(bucket, *face_key)
+        with self._lock:
+            faces = self._rendered.setdefault(bucket, {})
+            self._rendered.move_to_end(bucket)
+            while len(self._rendered) > self.max_buckets:
+                self._rendered.popitem(last=False)
+            return faces.setdefault(face_key, rendered)
+
+    def prerender_async(self, bucket, faces):
+        """
+        Renders every (label, value, image path) in `faces` at one size
+        bucket on a daemon thread, unless that bucket is already underway.
+        """
+        with self._lock:
+            if bucket in self._pending_buckets:
+                return None
+            self._pending_buckets.add(bucket)
+
+        def work():
+            try:
+                for face_key in faces:
+                    try:
+                        self._rendered_face(bucket, face_key)
+                    except Exception as e:
+                        print(f"An unexpected error occurred while rendering die face {face_key[1]!r}: {e}")
+            finally:
+                with self._lock:
+                    self._pending_buckets.discard(bucket)
+
+        thread = threading.Thread(target=work, name="die-faces", daemon=True)
+        thread.start()
+        return thread
+
+    # --- PhotoImages (Tk thread only) ---
+
+    def get(self, bucket, label, value, image_path=None):
+        """
+        Returns a PhotoImage of a whole die face at `bucket`, rendering it
+        now if the background thread has not reached it yet.
+        """
+        face_key = (label, value, image_path)
+        key = ("face", bucket) + face_key
+        photo = self.cache.get(key)
+        if photo is not None:
+            self.hits += 1
+            return photo
+        self.misses += 1
+        return self.cache.put(key, ImageTk.PhotoImage(self._rendered_face(bucket, face_key)))
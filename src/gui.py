@@ -1,41 +1,91 @@
 import tkinter as tk
 from tkinter import messagebox
+from tkinter import filedialog
 from tkinter import font as tkFont
-from PIL import Image, ImageTk
 import dice # Import our dice logic from dice.py
+import glyphs # Size-bucketed duration image atlas
+import scheduler # Drift-free timer for auto-roll mode
+import history # Compact roll history with undo/redo
+import dicesets # User-defined dice sets
+import instrumentation # Opt-in hot-path timings (main.py --profile)
+import resources # Asset paths, bundled fonts and the shared resource cache
+import rollstats # Running roll statistics for the statistics panel
 import webbrowser # Import the webbrowser module for opening URLs
 import os # Import os module for path manipulation
-import sys # Import sys module to check for PyInstaller environment
+import time
 
 # Removed: import requests
 # Removed: from packaging.version import parse as parse_version
 
+# Characters in pitch names that are drawn as their own segment.
+PITCH_ACCIDENTALS = ("ⵐ", "ȸ", "⩨", "𝄫", "#", "b", "/")
+
+# Auto-roll tempo range, in crotchet beats per minute.
+DEFAULT_TEMPO_BPM = 120
+MIN_TEMPO_BPM = 20
+MAX_TEMPO_BPM = 400
+
+# How often the auto-roll timing readout is refreshed.
+AUTO_ROLL_STATUS_INTERVAL_MS = 500
+
+# How often the undo/redo buttons and history scrubber catch up with new rolls.
+HISTORY_CONTROLS_INTERVAL_MS = 100
+
+# How long the window must stop resizing before the dice are laid out again.
+RESIZE_DEBOUNCE_MS = 60
+
+# How often the profiling overlay is refreshed when instrumentation is on.
+PROFILE_OVERLAY_INTERVAL_MS = 500
+
+# How often to check whether the canvas has its size yet, before the first frame.
+FIRST_FRAME_RETRY_MS = 10
+
+# Most often the statistics panel is redrawn, however fast the dice are rolled.
+STATS_REFRESH_INTERVAL_MS = 250
+
 class ChanceMusicDiceApp:
     """
     A Tkinter application for a chance music dice roller.
     """
-    def __init__(self, master, app_version): # app_version is now just for display
+    def __init__(self, master, app_version, started_at=None): # app_version is now just for display
         """
         Initializes the main application window and its components.
+        `started_at` is the time.perf_counter() reading when the program
+        started, used to measure the time to the first frame.
         """
         self.master = master
+        self._started_at = started_at if started_at is not None else time.perf_counter()
+        self.first_frame_ms = None
         self.local_app_version = app_version # Store the local version for display
         self.GITHUB_RELEASES_URL = "https://github.com/Ravis-World/Chance-Music-Dice-Python/releases" # User-friendly releases page URL
 
         master.title("Chance Music Dice Roller")
-        master.state('zoomed')
+        try:
+            master.state('zoomed') # Windows and macOS
+        except tk.TclError:
+            # X11 Tk has no 'zoomed' state, only the -zoomed attribute.
+            master.attributes('-zoomed', True)
         master.resizable(False, False)
         master.config(bg="#E6EBF3")
 
+        # --- Resources ---
+        # The asset root is resolved once, and fonts, text measurements and
+        # resized images share one bounded cache.
+        self.resources = resources.Resources()
+        resources.register_bundled_fonts()
+
+        # --- Duration Glyph Atlas ---
+        # Every duration image is decoded once, in the background from here on,
+        # and resizes are served from quantized size buckets kept in the shared cache.
+        self.glyph_atlas = glyphs.DurationGlyphAtlas(
+            (self.get_asset_path(os.path.join("images", os.path.basename(path))) for path in dice.duration_die.values()),
+            cache=self.resources.cache,
+        )
+        self.glyph_atlas.prerender_async()
+
         # --- Favicon Integration (PyInstaller-aware pathing) ---
+        icon_path = self.get_asset_path(os.path.join("images", "app_icon.ico"))
         try:
-            if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.abspath(os.path.dirname(__file__))
-            
-            icon_path = os.path.join(base_path, "assets", "images", "app_icon.ico")
-            
             master.iconbitmap(icon_path)
             
         except tk.TclError as e:
@@ -53,30 +103,28 @@ class ChanceMusicDiceApp:
         self.die_label_font_size = 20
         self.die_value_font_size = 40
 
-        self.title_font = tkFont.Font(family="Noto Sans", size=self.title_font_size, weight="bold")
-        self.button_font = tkFont.Font(family="Noto Sans", size=self.button_font_size, weight="bold")
-        self.instruction_font = tkFont.Font(family="Noto Sans", size=self.instruction_font_size)
-        self.die_label_font = tkFont.Font(family="Noto Sans", size=self.die_label_font_size, weight="bold")
-        self.die_value_font = tkFont.Font(family="Noto Sans", size=self.die_value_font_size, weight="bold")
-
-        self.tifinagh_font = tkFont.Font(family="Noto Sans Tifinagh", size=self.die_value_font_size, weight="bold")
-        self.math_font = tkFont.Font(family="Noto Sans Math", size=self.die_value_font_size, weight="bold")
+        # The bundled Noto fonts were registered above, so these resolve
+        # even when the fonts are not installed on the system.
+        self.title_font = self.resources.font("Noto Sans", self.title_font_size, "bold")
+        self.button_font = self.resources.font("Noto Sans", self.button_font_size, "bold")
+        self.instruction_font = self.resources.font("Noto Sans", self.instruction_font_size)
+        self.die_label_font = self.resources.font("Noto Sans", self.die_label_font_size, "bold")
+        self.die_value_font = self.resources.font("Noto Sans", self.die_value_font_size, "bold")
 
-        self.noto_sans_font_path = f"{dice.FONTS_DIR}/NotoSans-VariableFont_wdth,wght.ttf"
-        self.noto_tifinagh_font_path = f"{dice.FONTS_DIR}/NotoSansTifinagh-Regular.ttf"
-        self.noto_math_font_path = f"{dice.FONTS_DIR}/NotoSansMath-Regular.ttf"
+        self.tifinagh_font = self.resources.font("Noto Sans Tifinagh", self.die_value_font_size, "bold")
+        self.math_font = self.resources.font("Noto Sans Math", self.die_value_font_size, "bold")
 
         try:
             tkFont.nametofont("TkDefaultFont").configure(family="Noto Sans", size=12)
             tkFont.nametofont("TkTextFont").configure(family="Noto Sans", size=12)
             tkFont.nametofont("TkFixedFont").configure(family="Noto Sans", size=12)
-            tkFont.families()
         except Exception as e:
             print(f"Error configuring default fonts: {e}")
             messagebox.showerror("Font Error", "Could not configure default Noto Sans font. Please ensure it's installed.")
 
-        # --- Image Cache ---
-        self.duration_images_cache = {}
+        # --- Dice Set ---
+        # The four standard dice, until a custom dice set is opened.
+        self.dice_set = dicesets.default_dice_set()
 
         # --- UI Layout ---
         # 1. Top Bar Frame: Holds title and control buttons
@@ -122,6 +170,25 @@ class ChanceMusicDiceApp:
                                                cursor="hand2", padx=10, pady=5)
         self.go_to_releases_button.pack(side=tk.RIGHT, padx=5)
 
+        self.open_dice_set_button = tk.Button(self.control_panel_frame, text="Open Dice Set...", command=self.open_dice_set, font=self.instruction_font, relief=tk.RAISED, bd=2,
+                                              bg="#607D8B", fg="white", activebackground="#455A64", activeforeground="white",
+                                              cursor="hand2", padx=10, pady=5)
+        self.open_dice_set_button.pack(side=tk.RIGHT, padx=5)
+
+        self.statistics_button = tk.Button(self.control_panel_frame, text="Statistics...", command=self.show_statistics, font=self.instruction_font, relief=tk.RAISED, bd=2,
+                                           bg="#607D8B", fg="white", activebackground="#455A64", activeforeground="white",
+                                           cursor="hand2", padx=10, pady=5)
+        self.statistics_button.pack(side=tk.RIGHT, padx=5)
+
+        # Pre-rendered faces: each die is drawn as one bitmap made with Pillow
+        # and the bundled fonts, so a roll is a single image swap per die.
+        self.prerendered_faces = tk.BooleanVar(value=False)
+        self.face_atlas = None
+        self.prerendered_faces_check = tk.Checkbutton(self.control_panel_frame, text="Pre-rendered Faces", variable=self.prerendered_faces,
+                                                      command=self.toggle_prerendered_faces, font=self.instruction_font,
+                                                      bg="#E6EBF3", fg="#424242", selectcolor="#B0BEC5")
+        self.prerendered_faces_check.pack(side=tk.RIGHT, padx=5)
+
 
         # 2. Main Content Frame: Holds the dice canvas
         self.main_content_frame = tk.Frame(master, bg="#E6EBF3", padx=20, pady=20)
@@ -140,34 +207,111 @@ class ChanceMusicDiceApp:
                                      cursor="hand2", padx=25, pady=10)
         self.roll_button.pack(pady=10)
 
+        # Auto-roll: rolls on a tempo, each roll lasting as long as its rolled duration
+        self.auto_roll_frame = tk.Frame(self.bottom_controls_frame, bg="#E6EBF3")
+        self.auto_roll_frame.pack(pady=5)
+
+        tempo_label = tk.Label(self.auto_roll_frame, text="BPM:", font=self.instruction_font, bg="#E6EBF3", fg="#263238")
+        tempo_label.pack(side=tk.LEFT, padx=5)
+
+        self.tempo_bpm = tk.IntVar(value=DEFAULT_TEMPO_BPM)
+        self._last_valid_tempo = DEFAULT_TEMPO_BPM
+        self.tempo_spinbox = tk.Spinbox(self.auto_roll_frame, from_=MIN_TEMPO_BPM, to=MAX_TEMPO_BPM, textvariable=self.tempo_bpm,
+                                        width=5, font=self.instruction_font)
+        self.tempo_spinbox.pack(side=tk.LEFT, padx=5)
+
+        self.auto_roll_button = tk.Button(self.auto_roll_frame, text="Start Auto Roll", command=self.toggle_auto_roll, font=self.instruction_font,
+                                          relief=tk.RAISED, bd=2, bg="#607D8B", fg="white", activebackground="#455A64", activeforeground="white",
+                                          cursor="hand2", padx=10, pady=5)
+        self.auto_roll_button.pack(side=tk.LEFT, padx=5)
+
+        self.auto_roll_scheduler = scheduler.DriftFreeScheduler(self.master, self._auto_roll_tick)
+        self._auto_roll_status_after_id = None
+
+        # Roll history: undo/redo, scrubbing, and saving sessions for replay
+        self.roll_history = history.RollHistory(self.dice_set.names)
+        self._history_controls_after_id = None
+        self._scrubber_set_position = None
+
+        # Running statistics of every roll made this session. They are
+        # updated on each roll; the panel only reads them on its own timer.
+        self.roll_stats = rollstats.RollStatistics(self.dice_set)
+        self.statistics_window = None
+        self._statistics_after_id = None
+        self._statistics_shown_rolls = None
+
+        self.history_frame = tk.Frame(self.bottom_controls_frame, bg="#E6EBF3")
+        self.history_frame.pack(pady=5)
+
+        self.undo_button = tk.Button(self.history_frame, text="Undo", command=self.undo_roll, font=self.instruction_font,
+                                     relief=tk.RAISED, bd=2, state=tk.DISABLED, cursor="hand2", padx=10, pady=2)
+        self.undo_button.pack(side=tk.LEFT, padx=5)
+
+        self.redo_button = tk.Button(self.history_frame, text="Redo", command=self.redo_roll, font=self.instruction_font,
+                                     relief=tk.RAISED, bd=2, state=tk.DISABLED, cursor="hand2", padx=10, pady=2)
+        self.redo_button.pack(side=tk.LEFT, padx=5)
+
+        self.history_scrubber = tk.Scale(self.history_frame, from_=1, to=1, orient=tk.HORIZONTAL, showvalue=False, length=300,
+                                         command=self.on_scrub, bg="#E6EBF3", highlightthickness=0)
+        self.history_scrubber.pack(side=tk.LEFT, padx=5)
+
+        self.history_label = tk.Label(self.history_frame, text="No rolls yet", font=self.instruction_font, bg="#E6EBF3", fg="#555555")
+        self.history_label.pack(side=tk.LEFT, padx=5)
+
+        self.save_history_button = tk.Button(self.history_frame, text="Save History...", command=self.save_history, font=self.instruction_font,
+                                             relief=tk.RAISED, bd=2, cursor="hand2", padx=10, pady=2)
+        self.save_history_button.pack(side=tk.LEFT, padx=5)
+
+        self.open_history_button = tk.Button(self.history_frame, text="Open History...", command=self.open_history, font=self.instruction_font,
+                                             relief=tk.RAISED, bd=2, cursor="hand2", padx=10, pady=2)
+        self.open_history_button.pack(side=tk.LEFT, padx=5)
+
+        self.master.bind("<Control-z>", lambda event: self.undo_roll())
+        self.master.bind("<Control-y>", lambda event: self.redo_roll())
+
         self.instruction_label = tk.Label(self.bottom_controls_frame, text="Click \"Roll Dice\" to generate some music!",
                                           font=self.instruction_font, bg="#F0F3F7", fg="#555555",
                                           relief=tk.FLAT, bd=1, padx=20, pady=10)
         self.instruction_label.pack(pady=5)
 
         # --- Internal State for Dice Results (for redraw on resize) ---
-        self._last_rolled_duration = None
-        self._last_rolled_augmentation = None
-        self._last_rolled_chord = None
-        self._last_rolled_pitch = "C"
-
-        self.master.bind("<Configure>", self.on_resize)
-        
-        self.master.after(100, self.draw_dice_placeholders)
-        self.master.after(200, self.roll_dice)
+        self._last_roll = {"pitch": "C"} # Die name -> face currently shown
 
-    def draw_dice_placeholders(self):
-        canvas = self.dice_canvas
-        canvas.delete("all")
+        # --- Placeholder Items (moved in place on resize) ---
+        self.die_coords = []
+        self._die_items = [] # (shadow polygon id, face polygon id) per die
+        self._content_items = [] # Result text/image items per die, updated in place on each roll
+        self._face_items = [] # One image item per die when showing pre-rendered faces
+        self._current_die_images = {} # Die index -> displayed PhotoImage, kept alive after LRU eviction
+        self._pitch_layouts = {} # Pitch name -> measured segment layout
+        self._pitch_layout_font_size = None
+        self._last_canvas_size = None
+        self._resize_after_id = None
 
-        canvas_width = canvas.winfo_width()
-        canvas_height = canvas.winfo_height()
+        self.master.bind("<Configure>", self.on_resize)
 
-        if canvas_width <= 0 or canvas_height <= 0:
-            print("Warning: Canvas has invalid dimensions for drawing placeholders.")
-            return
+        # --- Profiling Overlay (only when instrumentation is on) ---
+        self.profiler = instrumentation.profiler
+        if self.profiler is not None:
+            self.profiler.add_gauge("image cache hits", lambda: self.glyph_atlas.hits)
+            self.profiler.add_gauge("image cache misses", lambda: self.glyph_atlas.misses)
+            self.profiler.add_gauge("rolls in history", lambda: len(self.roll_history))
+            self.profiler.add_gauge("resource cache", self.resources.cache.stats)
+            self.profiler.add_gauge("startup to first frame ms", lambda: self.first_frame_ms)
+            self.profile_overlay = tk.Label(self.main_content_frame, text="", font=("Courier", 10), justify=tk.LEFT,
+                                            bg="#263238", fg="#E6EBF3", padx=8, pady=6)
+            self.profile_overlay.place(relx=1.0, rely=0.0, anchor="ne")
+            self._profile_overlay_visible = True
+            self.master.bind("<F12>", lambda event: self.toggle_profile_overlay())
+            self.master.bind("<Shift-F12>", lambda event: self.dump_profile())
+            self._update_profile_overlay()
+        
+        self.master.after_idle(self._show_first_frame)
 
-        num_dice = 4
+    def compute_die_bboxes(self, canvas_width, canvas_height, num_dice=4):
+        """
+        Returns the (x1, y1, x2, y2) box of each die, centred on the canvas.
+        """
         padding_x = 50
         padding_y = 50
         spacing_x = 40
@@ -175,151 +319,596 @@ class ChanceMusicDiceApp:
         die_width = (canvas_width - 2 * padding_x - (num_dice - 1) * spacing_x) / num_dice
         die_height = die_width * 1.2
 
+        # With only a few dice, keep them from growing taller than the canvas.
+        max_die_height = canvas_height - 2 * padding_y
+        if die_height > max_die_height > 0:
+            die_height = max_die_height
+            die_width = die_height / 1.2
+
         total_content_width = (die_width * num_dice) + ((num_dice - 1) * spacing_x)
 
         start_x = (canvas_width - total_content_width) / 2
         start_y = (canvas_height - die_height) / 2
 
-        self.die_coords = []
-
+        bboxes = []
         current_x = start_x
         for i in range(num_dice):
             x1 = current_x
             x2 = x1 + die_width
             y1 = start_y
             y2 = y1 + die_height
-            
-            self.create_rounded_rectangle(canvas, x1 + 5, y1 + 5, x2 + 5, y2 + 5,
-                                          radius=15, fill="#D0D3DB", outline="")
+            bboxes.append((x1, y1, x2, y2))
+            current_x += die_width + spacing_x
+        return bboxes
 
-            self.create_rounded_rectangle(canvas, x1, y1, x2, y2,
-                                          radius=15, fill="#FFFFFF", outline="#A0A8B4", width=2)
-            self.die_coords.append({"type": "square", "bbox": (x1, y1, x2, y2)})
-            
-            current_x += die_width + spacing_x # die_w should be die_width here
+    def _show_first_frame(self):
+        """
+        Draws the dice and the first roll as soon as the canvas has been
+        given its size, and records how long startup took.
+        """
+        self.master.update_idletasks()
+        if self.dice_canvas.winfo_width() <= 1 or self.dice_canvas.winfo_height() <= 1:
+            self.master.after(FIRST_FRAME_RETRY_MS, self._show_first_frame)
+            return
+        self.draw_dice_placeholders()
+        self.roll_dice()
+        self.master.update_idletasks()
+        self.first_frame_ms = (time.perf_counter() - self._started_at) * 1000
+
+    @instrumentation.timed("draw_dice_placeholders")
+    def draw_dice_placeholders(self):
+        """
+        Lays the dice out for the current canvas size. Existing die shapes
+        are moved with coords() when possible; they are only created from
+        scratch on the first draw or when the number of dice changes.
+        """
+        canvas = self.dice_canvas
+
+        canvas_width = canvas.winfo_width()
+        canvas_height = canvas.winfo_height()
+
+        if canvas_width <= 0 or canvas_height <= 0:
+            print("Warning: Canvas has invalid dimensions for drawing placeholders.")
+            return
+
+        bboxes = self.compute_die_bboxes(canvas_width, canvas_height, len(self.dice_set))
+        self._last_canvas_size = (canvas_width, canvas_height)
+        self.die_coords = [{"type": "square", "bbox": bbox} for bbox in bboxes]
+
+        if self.prerendered_faces.get():
+            self._layout_face_items(bboxes)
+            self.redraw_dice_content()
+            return
+
+        canvas.itemconfigure("face_tag", state="hidden")
+        canvas.itemconfigure("placeholder_tag", state="normal")
+        if len(self._die_items) != len(bboxes):
+            canvas.delete("all")
+            self._die_items = []
+            self._content_items = []
+            self._face_items = []
+            for x1, y1, x2, y2 in bboxes:
+                shadow = self.create_rounded_rectangle(canvas, x1 + 5, y1 + 5, x2 + 5, y2 + 5,
+                                                       radius=15, fill="#D0D3DB", outline="", tags="placeholder_tag")
+                face = self.create_rounded_rectangle(canvas, x1, y1, x2, y2,
+                                                     radius=15, fill="#FFFFFF", outline="#A0A8B4", width=2, tags="placeholder_tag")
+                self._die_items.append((shadow, face))
+        else:
+            for (shadow, face), (x1, y1, x2, y2) in zip(self._die_items, bboxes):
+                canvas.coords(shadow, self.rounded_rectangle_points(x1 + 5, y1 + 5, x2 + 5, y2 + 5, radius=15))
+                canvas.coords(face, self.rounded_rectangle_points(x1, y1, x2, y2, radius=15))
 
         self.redraw_dice_content()
 
+    # --- Pre-rendered Faces ---
+
+    def toggle_prerendered_faces(self):
+        self._current_die_images = {}
+        self.draw_dice_placeholders()
+
+    def _get_face_atlas(self):
+        if self.face_atlas is None:
+            self.face_atlas = glyphs.DieFaceAtlas(
+                self.get_asset_path("fonts"),
+                label_size=round(self.master.winfo_fpixels(f"{self.die_label_font_size}p")),
+                value_size=round(self.master.winfo_fpixels(f"{self.die_value_font_size}p")),
+                glyph_atlas=self.glyph_atlas,
+                cache=self.resources.cache,
+            )
+        return self.face_atlas
+
+    def _face_entries(self):
+        """
+        Returns (label, face, image path) for every face of every die. The
+        built-in pitch die contributes the faces of both the 12- and 24-TET dice.
+        """
+        entries = []
+        for spec in self.dice_set.dice:
+            tets = (12, 24) if spec.builtin == "pitch" else (self.tet_choice.get(),)
+            faces = dict.fromkeys(face for tet in tets for face in spec.table_for(tet).faces)
+            entries.extend((spec.label, face, self._resolve_image_path(spec, face)) for face in faces)
+        return entries
+
+    def _layout_face_items(self, bboxes):
+        """
+        Places one image item per die in place of the drawn shapes, and starts
+        rendering every face at the new size in the background.
+        """
+        canvas = self.dice_canvas
+        if len(self._face_items) != len(bboxes):
+            for item in self._face_items:
+                canvas.delete(item)
+            self._face_items = [canvas.create_image(0, 0, tags="face_tag") for _ in bboxes]
+        for item, (x1, y1, x2, y2) in zip(self._face_items, bboxes):
+            # The bitmap includes the shadow, below and to the right of the die.
+            canvas.coords(item, (x1 + x2 + glyphs.DIE_SHADOW_OFFSET) / 2, (y1 + y2 + glyphs.DIE_SHADOW_OFFSET) / 2)
+        canvas.itemconfigure("placeholder_tag", state="hidden")
+        canvas.itemconfigure("content_tag", state="hidden")
+        canvas.itemconfigure("face_tag", state="normal")
+
+        if bboxes:
+            x1, y1, x2, y2 = bboxes[0]
+            atlas = self._get_face_atlas()
+            atlas.prerender_async(atlas.bucket_for(x2 - x1, y2 - y1), self._face_entries())
+
+    def _redraw_prerendered_faces(self):
+        atlas = self._get_face_atlas()
+        canvas = self.dice_canvas
+        for index, (spec, item, die_coords) in enumerate(zip(self.dice_set.dice, self._face_items, self.die_coords)):
+            x1, y1, x2, y2 = die_coords["bbox"]
+            value = self._last_roll.get(spec.name) or ""
+            image_path = self._resolve_image_path(spec, value) if value else None
+            photo = atlas.get(atlas.bucket_for(x2 - x1, y2 - y1), spec.label, value, image_path)
+            canvas.itemconfigure(item, image=photo)
+            self._current_die_images[index] = photo
+
+    def rounded_rectangle_points(self, x1, y1, x2, y2, radius):
+        return [x1+radius, y1,
+                x2-radius, y1,
+                x2, y1+radius,
+                x2, y2-radius,
+                x2-radius, y2,
+                x1+radius, y2,
+                x1, y2-radius,
+                x1, y1+radius]
 
     def create_rounded_rectangle(self, canvas, x1, y1, x2, y2, radius, **kwargs):
-        points = [x1+radius, y1,
-                  x2-radius, y1,
-                  x2, y1+radius,
-                  x2, y2-radius,
-                  x2-radius, y2,
-                  x1+radius, y2,
-                  x1, y2-radius,
-                  x1, y1+radius]
+        points = self.rounded_rectangle_points(x1, y1, x2, y2, radius)
         return canvas.create_polygon(points, smooth=True, **kwargs)
 
+    @instrumentation.timed("roll_dice")
     def roll_dice(self):
         tet_choice = self.tet_choice.get()
-        results = dice.roll_all_dice(tet_choice)
+        results = self.dice_set.roll(tet_choice)
+
+        self.roll_history.append(results, tet_choice)
+        self.roll_stats.record(results, tet_choice)
+        self.show_roll(tet_choice, results)
+        self._schedule_history_controls_update()
+
+    def show_roll(self, tet_choice, results):
+        """
+        Puts a roll on the dice, e.g. a new one or one from the history.
+        """
+        if self.tet_choice.get() != tet_choice:
+            self.tet_choice.set(tet_choice)
 
-        self._last_rolled_duration = results["duration"]
-        self._last_rolled_pitch = results["pitch"]
-        self._last_rolled_chord = results["chord"]
-        self._last_rolled_augmentation = results["augmentation"]
+        self._last_roll = dict(results)
 
         self.redraw_dice_content()
 
-    def redraw_dice_content(self):
-        canvas = self.dice_canvas
-        canvas.delete("content_tag") 
+    # --- Roll History ---
+
+    def _schedule_history_controls_update(self):
+        # Coalesced, so auto-rolling at high rates doesn't reconfigure the controls every roll.
+        if self._history_controls_after_id is None:
+            self._history_controls_after_id = self.master.after(HISTORY_CONTROLS_INTERVAL_MS, self._update_history_controls)
+
+    def _update_history_controls(self):
+        self._history_controls_after_id = None
+        rolls = len(self.roll_history)
+        position = self.roll_history.position
+
+        self.undo_button.config(state=tk.NORMAL if self.roll_history.can_undo() else tk.DISABLED)
+        self.redo_button.config(state=tk.NORMAL if self.roll_history.can_redo() else tk.DISABLED)
+        self.history_scrubber.config(to=max(1, rolls))
+        if self.history_scrubber.get() != max(1, position):
+            # Tk calls on_scrub for this at idle time too; remember it so that
+            # callback isn't mistaken for the user dragging the slider.
+            self._scrubber_set_position = max(1, position)
+            self.history_scrubber.set(max(1, position))
+        self.history_label.config(text=f"Roll {position} of {rolls}" if rolls else "No rolls yet")
+
+    def _show_history_position(self, current):
+        if current is not None:
+            self.show_roll(*current)
+        self._update_history_controls()
+
+    def undo_roll(self):
+        self.stop_auto_roll()
+        self._show_history_position(self.roll_history.undo())
+
+    def redo_roll(self):
+        self.stop_auto_roll()
+        self._show_history_position(self.roll_history.redo())
+
+    def on_scrub(self, value):
+        position = int(float(value))
+        if position == self._scrubber_set_position:
+            self._scrubber_set_position = None
+            return
+        if position == self.roll_history.position:
+            return
+        self.stop_auto_roll()
+        self._show_history_position(self.roll_history.seek(position))
 
-        if not self.die_coords:
+    def save_history(self):
+        path = filedialog.asksaveasfilename(title="Save Roll History", defaultextension=".cmdh",
+                                            filetypes=[("Roll history", "*.cmdh"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.roll_history.save(path)
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Could not save the roll history: {e}")
+
+    def open_history(self):
+        path = filedialog.askopenfilename(title="Open Roll History",
+                                          filetypes=[("Roll history", "*.cmdh"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            loaded = history.RollHistory.load(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Open Error", f"Could not open the roll history: {e}")
             return
-        
-        # Order of drawing content MUST match the order of die_coords: Duration, Pitch, Chord, Augmentation
 
-        # Duration Die (Index 0)
-        if self._last_rolled_duration:
-            die_bbox = self.die_coords[0]["bbox"]
-            die_center_x = (die_bbox[0] + die_bbox[2]) / 2
-            die_center_y = (die_bbox[1] + die_bbox[3]) / 2
+        if set(loaded.fields[1:]) != set(self.dice_set.names):
+            loaded.close()
+            messagebox.showerror("Open Error", "This roll history was recorded with a different set of dice. Open the matching dice set first.")
+            return
 
-            image_target_width = (die_bbox[2] - die_bbox[0]) * 0.8
-            image_target_height = (die_bbox[3] - die_bbox[1]) * 0.8 # Corrected to 0.8
+        self.stop_auto_roll()
+        self.roll_history.close()
+        self.roll_history = loaded
+        self._show_history_position(self.roll_history.current())
 
-            image_filename = dice.get_duration_image_path(self._last_rolled_duration).split('/')[-1]
-            image_path = self.get_asset_path(os.path.join("images", image_filename))
+    # --- Dice Sets ---
 
-            if image_path:
-                tk_image = self.load_and_resize_image(image_path, image_target_width, image_target_height)
-                if tk_image:
-                    canvas.create_image(die_center_x, die_center_y, image=tk_image, tags="content_tag") # Centered
-                    self.duration_images_cache[("current_display", self._last_rolled_duration)] = tk_image
+    def open_dice_set(self):
+        path = filedialog.askopenfilename(title="Open Dice Set",
+                                          filetypes=[("Dice sets", "*.toml *.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            dice_set = dicesets.load_dice_set(path)
+        except dicesets.DiceSetError as e:
+            messagebox.showerror("Dice Set Error", str(e))
+            return
+        self.use_dice_set(dice_set)
 
-            canvas.create_text(die_center_x, die_bbox[1] + 20,
-                               text="Duration:",
-                               font=self.die_label_font, fill="#555555", tags="content_tag")
+    def use_dice_set(self, dice_set):
+        """
+        Switches to another dice set, laying the canvas out for its number of
+        dice and starting a fresh history for it.
+        """
+        self.stop_auto_roll()
+        self.dice_set = dice_set
+        self._last_roll = {}
+        self._current_die_images = {}
+        self.roll_history.close()
+        self.roll_history = history.RollHistory(dice_set.names)
+        self.roll_stats = rollstats.RollStatistics(dice_set)
+        self._statistics_shown_rolls = None
+
+        # Forget the old shapes so the next layout rebuilds them for the new dice.
+        self.dice_canvas.delete("all")
+        self._die_items = []
+        self._content_items = []
+        self._face_items = []
+        self.draw_dice_placeholders()
+        self.roll_dice()
 
+    # --- Roll Statistics ---
 
-        # Pitch Die (Index 1)
-        if self._last_rolled_pitch:
-            self.update_pitch_display_on_canvas(self._last_rolled_pitch, self.die_coords[1])
+    def show_statistics(self):
+        """
+        Opens the statistics panel, or raises it if it is already open.
+        """
+        if self.statistics_window is not None:
+            self.statistics_window.lift()
+            return
+        self.statistics_window = tk.Toplevel(self.master, bg="#E6EBF3")
+        self.statistics_window.title("Roll Statistics")
+        self.statistics_window.protocol("WM_DELETE_WINDOW", self.close_statistics)
+
+        buttons = tk.Frame(self.statistics_window, bg="#E6EBF3")
+        buttons.pack(side=tk.BOTTOM, fill=tk.X, pady=5)
+        tk.Button(buttons, text="Reset", command=self.reset_statistics, font=self.instruction_font,
+                  relief=tk.RAISED, bd=2, cursor="hand2", padx=10, pady=2).pack(side=tk.RIGHT, padx=10)
+
+        self.statistics_text = tk.Text(self.statistics_window, width=96, height=36, wrap=tk.NONE,
+                                       font=self.resources.font("Courier", self.instruction_font_size),
+                                       bg="white", fg="#424242", relief=tk.FLAT, padx=10, pady=10)
+        self.statistics_text.pack(expand=True, fill=tk.BOTH, padx=10, pady=(10, 0))
+
+        self._statistics_shown_rolls = None
+        self._refresh_statistics()
+
+    def close_statistics(self):
+        if self._statistics_after_id is not None:
+            self.master.after_cancel(self._statistics_after_id)
+            self._statistics_after_id = None
+        if self.statistics_window is not None:
+            self.statistics_window.destroy()
+            self.statistics_window = None
+
+    def reset_statistics(self):
+        self.roll_stats.reset()
+        self._statistics_shown_rolls = None
+
+    def _refresh_statistics(self):
+        """
+        Redraws the panel if anything was rolled since it was last drawn,
+        then checks again after STATS_REFRESH_INTERVAL_MS. Summarising is
+        proportional to the number of faces, not to the rolling rate.
+        """
+        self._statistics_after_id = None
+        if self.statistics_window is None:
+            return
+        if self.roll_stats.rolls != self._statistics_shown_rolls:
+            self._statistics_shown_rolls = self.roll_stats.rolls
+            text = rollstats.format_summary(self.roll_stats.summary())
+            self.statistics_text.config(state=tk.NORMAL)
+            self.statistics_text.delete("1.0", tk.END)
+            self.statistics_text.insert("1.0", text)
+            self.statistics_text.config(state=tk.DISABLED)
+        self._statistics_after_id = self.master.after(STATS_REFRESH_INTERVAL_MS, self._refresh_statistics)
+
+    # --- Auto Roll ---
+
+    def get_tempo(self):
+        """
+        Returns the tempo from the BPM box, falling back to the last valid
+        value while the box holds something that isn't a number.
+        """
+        try:
+            tempo = self.tempo_bpm.get()
+        except tk.TclError:
+            return self._last_valid_tempo
+        if MIN_TEMPO_BPM <= tempo <= MAX_TEMPO_BPM:
+            self._last_valid_tempo = tempo
+        return self._last_valid_tempo
+
+    def toggle_auto_roll(self):
+        if self.auto_roll_scheduler.running:
+            self.stop_auto_roll()
+        else:
+            self.start_auto_roll()
+
+    def start_auto_roll(self):
+        self.auto_roll_scheduler.start()
+        self.auto_roll_button.config(text="Stop Auto Roll")
+        self._update_auto_roll_status()
+
+    def stop_auto_roll(self):
+        self.auto_roll_scheduler.stop()
+        self.auto_roll_button.config(text="Start Auto Roll")
+        if self._auto_roll_status_after_id is not None:
+            self.master.after_cancel(self._auto_roll_status_after_id)
+            self._auto_roll_status_after_id = None
+        self._update_auto_roll_status()
+
+    def _auto_roll_tick(self):
+        """
+        Rolls once and returns how many seconds the rolled note lasts at the
+        current tempo, which is when the next roll is due.
+        """
+        self.roll_dice()
+        # Dice sets without the built-in duration and augmentation dice roll once per beat.
+        beats = 1
+        if self.dice_set.has_builtin("duration") and self.dice_set.has_builtin("augmentation"):
+            beats = dice.event_beats(self._last_roll["duration"], self._last_roll["augmentation"])
+        return float(beats) * 60.0 / self.get_tempo()
+
+    def _update_auto_roll_status(self):
+        stats = self.auto_roll_scheduler.stats.summary()
+        if not self.auto_roll_scheduler.running and not stats["events"]:
+            return
+        self.instruction_label.config(
+            text=f"Auto roll: {stats['events']} rolls, jitter mean {stats['mean_ms']:.1f} ms / "
+                 f"p99 {stats['p99_ms']:.1f} ms / max {stats['max_ms']:.1f} ms, {stats['missed']} missed deadlines"
+        )
+        if self.auto_roll_scheduler.running:
+            self._auto_roll_status_after_id = self.master.after(AUTO_ROLL_STATUS_INTERVAL_MS, self._update_auto_roll_status)
+
+    def toggle_profile_overlay(self):
+        self._profile_overlay_visible = not self._profile_overlay_visible
+        if self._profile_overlay_visible:
+            self.profile_overlay.place(relx=1.0, rely=0.0, anchor="ne")
+            self._update_profile_overlay_text()
+        else:
+            self.profile_overlay.place_forget()
 
+    def dump_profile(self):
+        path = self.profiler.dump()
+        if path:
+            self.instruction_label.config(text=f"Profile written to {os.path.abspath(path)}")
 
-        # Chord Die (Index 2)
-        if self._last_rolled_chord:
-            die_bbox = self.die_coords[2]["bbox"]
-            die_center_x = (die_bbox[0] + die_bbox[2]) / 2
-            die_center_y = (die_bbox[1] + die_bbox[3]) / 2
-            canvas.create_text(die_center_x, die_center_y + 10,
-                               text=self._last_rolled_chord,
-                               font=self.die_value_font, fill="#333333", tags="content_tag")
-            canvas.create_text(die_center_x, die_bbox[1] + 20,
-                               text="Chord:",
-                               font=self.die_label_font, fill="#555555", tags="content_tag")
-
-        # Augmentation Die (Index 3)
-        if self._last_rolled_augmentation:
-            die_bbox = self.die_coords[3]["bbox"]
-            die_center_x = (die_bbox[0] + die_bbox[2]) / 2
-            die_center_y = (die_bbox[1] + die_bbox[3]) / 2
-            canvas.create_text(die_center_x, die_center_y + 10,
-                               text=self._last_rolled_augmentation,
-                               font=self.die_value_font, fill="#333333", tags="content_tag")
-            canvas.create_text(die_center_x, die_bbox[1] + 20,
-                               text="Augmentation:",
-                               font=self.die_label_font, fill="#555555", tags="content_tag")
+    def _update_profile_overlay_text(self):
+        self.profile_overlay.config(text=self.profiler.overlay_text() + "\n\nF12: hide   Shift+F12: write JSON")
 
+    def _update_profile_overlay(self):
+        if self._profile_overlay_visible:
+            self._update_profile_overlay_text()
+        self.master.after(PROFILE_OVERLAY_INTERVAL_MS, self._update_profile_overlay)
+
+    def _ensure_content_items(self):
+        """
+        Creates the text and image items that show roll results, once per
+        die. They start hidden and are updated in place by redraw_dice_content.
+        """
+        if self._content_items:
+            return self._content_items
 
-    def update_pitch_display_on_canvas(self, pitch_result, die_coords):
         canvas = self.dice_canvas
-        canvas.delete("pitch_content_tag") 
+        for spec in self.dice_set.dice:
+            items = {
+                "label": canvas.create_text(0, 0, text=spec.label, font=self.die_label_font, fill="#555555",
+                                            tags="content_tag", state="hidden"),
+            }
+            if spec.kind == "image":
+                items["image"] = canvas.create_image(0, 0, tags="content_tag", state="hidden")
+            if spec.kind == "pitch":
+                items["segments"] = []
+            else:
+                # Image dice fall back to text for faces without an image.
+                items["value"] = canvas.create_text(0, 0, text="", font=self.die_value_font, fill="#333333",
+                                                    tags="content_tag", state="hidden")
+            self._content_items.append(items)
+        return self._content_items
 
-        die_bbox = die_coords["bbox"]
-        die_center_x = (die_bbox[0] + die_bbox[2]) / 2
-        die_center_y = (die_bbox[1] + die_bbox[3]) / 2
+    def _hide_die_content(self, items):
+        canvas = self.dice_canvas
+        for key, item in items.items():
+            if key == "segments":
+                for segment_item in item:
+                    canvas.itemconfigure(segment_item, state="hidden")
+            else:
+                canvas.itemconfigure(item, state="hidden")
 
-        canvas.create_text(die_center_x, die_bbox[1] + 20,
-                           text="Pitch:",
-                           font=self.die_label_font, fill="#555555", tags="pitch_content_tag")
+    def _resolve_image_path(self, spec, face):
+        image_path = spec.image_path(face)
+        if image_path and spec.builtin == "duration":
+            # Built-in duration images live in the bundled assets.
+            image_path = self.get_asset_path(os.path.join("images", image_path.split('/')[-1]))
+        return image_path
 
-        total_text_width = 0
-        temp_segments = []
-        
+    @instrumentation.timed("redraw_dice_content")
+    def redraw_dice_content(self):
+        """
+        Shows the last roll on the dice. The canvas items are reused:
+        they are moved with coords() and changed with itemconfigure().
+        """
+        if not self.die_coords:
+            return
+        if self.prerendered_faces.get():
+            self._redraw_prerendered_faces()
+            return
+
+        canvas = self.dice_canvas
+        all_items = self._ensure_content_items()
+
+        # Dice are drawn in the order of the dice set, which matches die_coords.
+        for index, (spec, items, die_coords) in enumerate(zip(self.dice_set.dice, all_items, self.die_coords)):
+            value = self._last_roll.get(spec.name)
+            if not value:
+                self._hide_die_content(items)
+                continue
+
+            die_bbox = die_coords["bbox"]
+            die_center_x = (die_bbox[0] + die_bbox[2]) / 2
+            die_center_y = (die_bbox[1] + die_bbox[3]) / 2
+
+            canvas.coords(items["label"], die_center_x, die_bbox[1] + 20)
+            canvas.itemconfigure(items["label"], state="normal")
+
+            if spec.kind == "pitch":
+                self.update_pitch_display_on_canvas(value, die_coords, items)
+                continue
+
+            tk_image = None
+            if spec.kind == "image":
+                image_path = self._resolve_image_path(spec, value)
+                if image_path:
+                    image_target_width = (die_bbox[2] - die_bbox[0]) * 0.8
+                    image_target_height = (die_bbox[3] - die_bbox[1]) * 0.8 # Corrected to 0.8
+                    tk_image = self.load_and_resize_image(image_path, image_target_width, image_target_height)
+                if tk_image:
+                    canvas.coords(items["image"], die_center_x, die_center_y) # Centered
+                    canvas.itemconfigure(items["image"], image=tk_image, state="normal")
+                    self._current_die_images[index] = tk_image
+                else:
+                    canvas.itemconfigure(items["image"], state="hidden")
+
+            if tk_image:
+                canvas.itemconfigure(items["value"], state="hidden")
+            else:
+                canvas.coords(items["value"], die_center_x, die_center_y + 10)
+                canvas.itemconfigure(items["value"], text=value, state="normal")
+
+    def split_pitch_segments(self, pitch_result):
+        """
+        Splits a pitch name into runs of text, giving each accidental its own
+        segment so it can use the font that has its glyph.
+        """
+        segments = []
         segment_start_index = 0
         for i, char in enumerate(pitch_result):
-            if char in ["ⵐ", "ȸ", "⩨", "𝄫", "#", "b", "/"]:
+            if char in PITCH_ACCIDENTALS:
                 if segment_start_index < i:
-                    temp_segments.append((pitch_result[segment_start_index:i], self.die_value_font))
-                temp_segments.append((char, self.get_font_for_char(char)))
+                    segments.append((pitch_result[segment_start_index:i], self.die_value_font))
+                segments.append((char, self.get_font_for_char(char)))
                 segment_start_index = i + 1
-        
+
         if segment_start_index < len(pitch_result):
-            temp_segments.append((pitch_result[segment_start_index:], self.die_value_font))
+            segments.append((pitch_result[segment_start_index:], self.die_value_font))
+        return segments
+
+    def get_pitch_layout(self, pitch_result):
+        """
+        Returns (total width, [(text, font, x offset), ...]) for a pitch name.
+        Layouts for every face of both pitch dice are measured once per font
+        size and then looked up, instead of measuring on every roll.
+        """
+        font_size = self.die_value_font.cget("size")
+        if font_size != self._pitch_layout_font_size:
+            self._pitch_layouts = {}
+            self._pitch_layout_font_size = font_size
+            for face in dice.pitch_die_12tet + dice.pitch_die_24tet:
+                self._pitch_layouts[face] = self._measure_pitch_layout(face)
+
+        layout = self._pitch_layouts.get(pitch_result)
+        if layout is None:
+            layout = self._pitch_layouts[pitch_result] = self._measure_pitch_layout(pitch_result)
+        return layout
+
+    def _measure_pitch_layout(self, pitch_result):
+        laid_out = []
+        offset = 0
+        for text, font_obj in self.split_pitch_segments(pitch_result):
+            laid_out.append((text, font_obj, offset))
+            offset += self.resources.measure(font_obj, text)
+        return offset, laid_out
+
+    @instrumentation.timed("update_pitch_display")
+    def update_pitch_display_on_canvas(self, pitch_result, die_coords, die_items):
+        """
+        Draws a pitch name centred on its die, using the die's pool of
+        segment text items and the cached layout for the name.
+        """
+        canvas = self.dice_canvas
+
+        die_bbox = die_coords["bbox"]
+        die_center_x = (die_bbox[0] + die_bbox[2]) / 2
+        die_center_y = (die_bbox[1] + die_bbox[3]) / 2
 
-        for text, font_obj in temp_segments:
-            total_text_width += font_obj.measure(text)
+        total_text_width, segments = self.get_pitch_layout(pitch_result)
+        segment_items = die_items["segments"]
+        while len(segment_items) < len(segments):
+            segment_items.append(canvas.create_text(0, 0, text="", anchor="w", fill="#333333",
+                                                    tags="content_tag", state="hidden"))
 
-        current_x = die_center_x - (total_text_width / 2)
+        start_x = die_center_x - (total_text_width / 2)
         text_y = die_center_y + 10
 
-        for text, font_obj in temp_segments:
-            canvas.create_text(current_x, text_y, text=text, anchor="w", font=font_obj, fill="#333333", tags="pitch_content_tag")
-            current_x += font_obj.measure(text)
+        for i, item in enumerate(segment_items):
+            if i < len(segments):
+                text, font_obj, offset = segments[i]
+                canvas.coords(item, start_x + offset, text_y)
+                canvas.itemconfigure(item, text=text, font=font_obj, state="normal")
+            else:
+                canvas.itemconfigure(item, state="hidden")
 
     def get_font_for_char(self, char):
         if char == "ⵐ": return self.tifinagh_font
@@ -331,59 +920,39 @@ class ChanceMusicDiceApp:
         webbrowser.open_new(documentation_url)
 
     def on_resize(self, event):
-        _ = event
-        self.master.update_idletasks()
+        """
+        Coalesces bursts of <Configure> events into one relayout.
+        Events from widgets other than the window and the dice canvas are ignored.
+        """
+        if event.widget is not self.master and event.widget is not self.dice_canvas:
+            return
+        instrumentation.count("resize events")
+        if self._resize_after_id is not None:
+            self.master.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.master.after(RESIZE_DEBOUNCE_MS, self._apply_resize)
+
+    def _apply_resize(self):
+        self._resize_after_id = None
+        canvas_size = (self.dice_canvas.winfo_width(), self.dice_canvas.winfo_height())
+        if canvas_size == self._last_canvas_size:
+            return
         self.draw_dice_placeholders()
 
+    @instrumentation.timed("load_and_resize_image")
     def load_and_resize_image(self, image_path, target_width, target_height):
-        if target_width <= 0 or target_height <= 0:
-            return None
-
-        cache_key = (image_path, target_width, target_height)
-        if cache_key in self.duration_images_cache:
-            return self.duration_images_cache[cache_key]
-
-        try:
-            pil_image = Image.open(image_path)
-            original_width, original_height = pil_image.size
-
-            ratio = min(target_width / max(1, original_width), target_height / max(1, original_height))
-            new_width = int(original_width * ratio)
-            new_height = int(original_height * ratio)
-
-            min_dim = 60
-            if new_width < min_dim or new_height < min_dim:
-                scale_up_ratio = max(min_dim / max(1, new_width), min_dim / max(1, new_height))
-                new_width = int(new_width * scale_up_ratio)
-                new_height = int(new_height * scale_up_ratio)
-
-            new_width = min(new_width, target_width)
-            new_height = min(new_height, target_height)
-            
-            pil_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            tk_image = ImageTk.PhotoImage(pil_image)
-            self.duration_images_cache[cache_key] = tk_image
-            return tk_image
-        except FileNotFoundError:
-            print(f"Error: Image not found at {image_path}. Check your --add-data path in PyInstaller for assets.")
-            return None
-        except Exception as e:
-            print(f"An unexpected error occurred while loading image {image_path}: {e}")
-            return None
+        """
+        Returns a PhotoImage of the image fitted into the target box, served
+        from the glyph atlas's size buckets rather than resized per call.
+        """
+        return self.glyph_atlas.get(image_path, target_width, target_height)
 
     def get_asset_path(self, relative_path):
         """
         Resolves the absolute path to an asset, handling both
         development environment and PyInstaller bundled environment.
+        The asset root is worked out once; see resources.asset_root.
         """
-        if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
-            # Running as a PyInstaller bundle
-            return os.path.join(sys._MEIPASS, "assets", relative_path)
-        else:
-            # Running from source (assuming assets is sibling to src)
-            current_script_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root_dir = os.path.dirname(current_script_dir) # Go up from src to project root
-            return os.path.join(project_root_dir, "assets", relative_path)
+        return resources.asset_path(relative_path)
 
     def go_to_releases(self):
         """
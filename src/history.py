@@ -0,0 +1,270 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import dice # Import our dice logic from dice.py
+
+HISTORY_MAGIC = b"CMDH"
+HISTORY_VERSION = 1
+
+def _typecode(codes):
+    # Columns are arrays, or memoryviews over a loaded file.
+    return codes.format if isinstance(codes, memoryview) else codes.typecode
+
+class _Column:
+    """
+    One field of the history: an append-only array of small integer codes
+    and the label table they index into. Codes are one byte each until a
+    column sees more than 256 distinct labels, then two.
+    """
+    def __init__(self, labels=(), codes=None):
+        self.labels = list(labels)
+        self.lookup = {label: code for code, label in enumerate(self.labels)}
+        self.codes = codes if codes is not None else array("B")
+
+    def code_for(self, label):
+        code = self.lookup.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.labels.append(label)
+            self.lookup[label] = code
+        return code
+
+    def append(self, label):
+        code = self.code_for(label)
+        if code > 0xFF and self.codes.typecode == "B":
+            self.codes = array("H", self.codes)
+        self.codes.append(code)
+
+class RollHistory:
+    """
+    Records every roll as a few bytes of integer codes in append-only
+    columns, with an undo/redo cursor over them.
+
+    Undo and redo only move the cursor. Rolling again always appends to the
+    end rather than discarding anything, so the full sequence is kept and
+    can be replayed exactly. Every roll stores its TET plus one face per
+    die in `dice_names`, the built-in dice by default.
+
+    Histories saved with save() are memory-mapped by load(), so even
+    millions of rolls open instantly; they are copied into memory the
+    first time something new is recorded.
+    """
+    def __init__(self, dice_names=dice.BATCH_DICE):
+        self.fields = ("tet",) + tuple(dice_names)
+        self._columns = {name: _Column() for name in self.fields}
+        self._count = 0
+        self.position = 0
+        self._mapped = None
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        """
+        Bytes used by the code columns (label tables not included).
+        """
+        return sum(len(column.codes) * column.codes.itemsize for column in self._columns.values())
+
+    # --- Recording ---
+
+    def _make_writable(self):
+        if self._mapped is None:
+            return
+        for column in self._columns.values():
+            # Byteswapped columns were already copied into arrays by load().
+            if isinstance(column.codes, memoryview):
+                codes = array(column.codes.format)
+                codes.frombytes(column.codes.cast("B"))
+                column.codes.release()
+                column.codes = codes
+        self.close()
+
+    def append(self, roll, tet_choice):
+        """
+        Records a roll dict from dice.roll_all_dice and moves the cursor to it.
+        """
+        self._make_writable()
+        self._columns["tet"].append(tet_choice)
+        for name in self.fields[1:]:
+            self._columns[name].append(roll[name])
+        self._count += 1
+        self.position = self._count
+
+    def extend_batch(self, batch):
+        """
+        Records every roll in a dice.RollBatch, translating its face codes
+        in bulk, and moves the cursor to the last one.
+        """
+        if not len(batch):
+            return
+        self._make_writable()
+        self._columns["tet"].codes.extend([self._columns["tet"].code_for(batch.tet_choice)] * len(batch))
+        for name in self.fields[1:]:
+            column = self._columns[name]
+            translate = [column.code_for(label) for label in batch.tables[name]]
+            if max(translate) > 0xFF and column.codes.typecode == "B":
+                column.codes = array("H", column.codes)
+            column.codes.extend(translate[code] for code in batch.columns[name])
+        self._count += len(batch)
+        self.position = self._count
+
+    # --- Reading ---
+
+    def __getitem__(self, index):
+        """
+        Returns (tet_choice, roll dict) for the roll at `index`.
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("roll history index out of range")
+        tet = self._columns["tet"]
+        roll = {}
+        for name in self.fields[1:]:
+            column = self._columns[name]
+            roll[name] = column.labels[column.codes[index]]
+        return tet.labels[tet.codes[index]], roll
+
+    def current(self):
+        """
+        Returns (tet_choice, roll dict) at the cursor, or None if empty.
+        """
+        if self.position == 0:
+            return None
+        return self[self.position - 1]
+
+    def replay(self, start=0, stop=None):
+        """
+        Yields (tet_choice, roll dict) for each recorded roll in order.
+        """
+        stop = self._count if stop is None else min(stop, self._count)
+        for index in range(start, stop):
+            yield self[index]
+
+    # --- Undo, Redo and Scrubbing ---
+
+    def can_undo(self):
+        return self.position > 1
+
+    def can_redo(self):
+        return self.position < self._count
+
+    def undo(self):
+        """
+        Steps the cursor back one roll and returns the roll now current.
+        """
+        if self.can_undo():
+            self.position -= 1
+        return self.current()
+
+    def redo(self):
+        """
+        Steps the cursor forward one roll and returns the roll now current.
+        """
+        if self.can_redo():
+            self.position += 1
+        return self.current()
+
+    def seek(self, position):
+        """
+        Moves the cursor so that roll number `position` (counting from 1)
+        is current, and returns it.
+        """
+        self.position = max(min(1, self._count), min(position, self._count))
+        return self.current()
+
+    # --- Files ---
+
+    def save(self, path):
+        """
+        Writes the history to a binary file: a JSON header with the label
+        tables, followed by each code column as raw bytes.
+        """
+        header = {
+            "version": HISTORY_VERSION,
+            "count": self._count,
+            "position": self.position,
+            "byteorder": sys.byteorder,
+            "fields": [
+                {"name": name, "typecode": _typecode(self._columns[name].codes), "labels": self._columns[name].labels}
+                for name in self.fields
+            ],
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as fp:
+            fp.write(HISTORY_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+            for name in self.fields:
+                fp.write(self._columns[name].codes)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Opens a saved history by memory-mapping its columns.
+        """
+        with open(path, "rb") as fp:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        history = None
+        try:
+            if mapped[:4] != HISTORY_MAGIC:
+                raise ValueError(f"{path} is not a roll history file.")
+            (header_length,) = struct.unpack_from("<I", mapped, 4)
+            header = json.loads(mapped[8:8 + header_length].decode("utf-8"))
+            if header.get("version") != HISTORY_VERSION:
+                raise ValueError(f"{path} uses unsupported history version {header.get('version')}.")
+
+            names = [field["name"] for field in header["fields"]]
+            if not names or names[0] != "tet":
+                raise ValueError(f"{path} has no TET column.")
+            history = cls(names[1:])
+            history._count = header["count"]
+            offset = 8 + header_length
+            view = memoryview(mapped)
+            history._mapped = (mapped, view)
+            for field in header["fields"]:
+                typecode = field["typecode"]
+                size = history._count * array(typecode).itemsize
+                if offset + size > len(mapped):
+                    raise ValueError(f"{path} is truncated.")
+                codes = view[offset:offset + size].cast(typecode)
+                if typecode != "B" and header.get("byteorder", sys.byteorder) != sys.byteorder:
+                    # Saved on a machine with the other byte order: copy and swap.
+                    swapped = array(typecode)
+                    swapped.frombytes(codes.cast("B"))
+                    swapped.byteswap()
+                    codes.release()
+                    codes = swapped
+                history._columns[field["name"]] = _Column(field["labels"], codes)
+                offset += size
+        except Exception:
+            if history is not None and history._mapped is not None:
+                history.close()
+            else:
+                mapped.close()
+            raise
+
+        history.position = min(header.get("position", history._count), history._count)
+        return history
+
+    def close(self):
+        """
+        Releases the memory map of a loaded history. Reading a loaded
+        history after this is not possible unless something was recorded.
+        """
+        if self._mapped is None:
+            return
+        mapped, view = self._mapped
+        self._mapped = None
+        for column in self._columns.values():
+            if isinstance(column.codes, memoryview):
+                column.codes.release()
+        view.release()
+        mapped.close()
@@ -0,0 +1,197 @@
+"""
+Opt-in timing instrumentation for the GUI's hot paths.
+
+Turn it on with `python main.py --profile` (or `--profile=timings.json`
+to also write the numbers to a JSON file on exit), or by setting the
+CHANCE_DICE_PROFILE environment variable to 1 or to a .json path.
+
+Methods are instrumented with the @timed decorator. It is applied when
+the GUI module is imported, so when instrumentation is off the decorator
+hands back the original function and costs nothing at all. enable() must
+therefore be called before the GUI is imported, which main.py does.
+"""
+import bisect
+import functools
+import json
+import os
+import time
+
+ENV_VAR = "CHANCE_DICE_PROFILE"
+
+# Where a profile is written on request when no dump path was given.
+DEFAULT_DUMP_PATH = "chance-dice-profile.json"
+
+# Upper edges of the histogram buckets, in milliseconds. Anything slower
+# than the last edge lands in a final overflow bucket.
+BUCKET_EDGES_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 16.7, 25, 50, 100, 250, 500, 1000)
+
+class TimingHistogram:
+    """
+    Counts of how long one operation took, in fixed log-spaced buckets,
+    plus its total and worst time. Recording is O(log buckets) and memory
+    use is fixed however many calls are made.
+    """
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_EDGES_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms):
+        self.buckets[bisect.bisect_left(BUCKET_EDGES_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, fraction):
+        """
+        Returns an upper bound on the given percentile (0.5 for the
+        median), read off the bucket edges.
+        """
+        if not self.count:
+            return 0.0
+        needed = fraction * self.count
+        seen = 0
+        for edge, bucket_count in zip(BUCKET_EDGES_MS, self.buckets):
+            seen += bucket_count
+            if seen >= needed:
+                return min(edge, self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": {
+                f"<={edge}ms": bucket_count for edge, bucket_count in zip(BUCKET_EDGES_MS, self.buckets)
+            } | {f">{BUCKET_EDGES_MS[-1]}ms": self.buckets[-1]},
+        }
+
+class Profiler:
+    """
+    Collects timing histograms by operation name, plain event counters, and
+    gauges (callables sampled when a report is made, such as cache hit
+    counts kept elsewhere).
+    """
+    def __init__(self, dump_path=None):
+        self.dump_path = dump_path
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def record(self, name, elapsed_ms):
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings[name] = TimingHistogram()
+        histogram.record(elapsed_ms)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_gauge(self, name, read):
+        self.gauges[name] = read
+
+    def report(self):
+        """
+        Returns everything recorded so far as a JSON-ready dict.
+        """
+        gauges = {}
+        for name, read in self.gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                gauges[name] = f"unavailable: {e}"
+        return {
+            "uptime_s": time.perf_counter() - self.started,
+            "timings": {name: histogram.summary() for name, histogram in self.timings.items()},
+            "counters": dict(self.counters),
+            "gauges": gauges,
+        }
+
+    def overlay_text(self):
+        """
+        Returns a short plain-text report for the in-app overlay.
+        """
+        lines = []
+        for name, histogram in self.timings.items():
+            summary = histogram.summary()
+            lines.append(f"{name:<26} n={summary['count']:<6} mean {summary['mean_ms']:6.2f}  "
+                         f"p99 {summary['p99_ms']:6.2f}  max {summary['max_ms']:7.2f} ms")
+        for name, value in self.counters.items():
+            lines.append(f"{name:<26} {value}")
+        for name, value in self.report()["gauges"].items():
+            lines.append(f"{name:<26} {value}")
+        return "\n".join(lines) or "No timings yet"
+
+    def dump(self, path=None):
+        """
+        Writes report() to `path`, or else the profiler's dump path, or
+        else DEFAULT_DUMP_PATH, as JSON. Returns the path written, or None
+        if it could not be written.
+        """
+        path = path or self.dump_path or DEFAULT_DUMP_PATH
+        try:
+            with open(path, "w", encoding="utf-8") as fp:
+                json.dump(self.report(), fp, indent=2)
+        except OSError as e:
+            print(f"Error: Could not write profile to {path}: {e}")
+            return None
+        return path
+
+# The active Profiler, or None while instrumentation is off.
+profiler = None
+
+def enable(dump_path=None):
+    """
+    Turns instrumentation on and returns the Profiler. Call this before
+    importing the modules to be instrumented.
+    """
+    global profiler
+    if profiler is None:
+        profiler = Profiler(dump_path)
+    elif dump_path:
+        profiler.dump_path = dump_path
+    return profiler
+
+def enable_from_environment():
+    """
+    Enables instrumentation if CHANCE_DICE_PROFILE is set to 1 or a .json
+    path. Returns the Profiler, or None if it stays off.
+    """
+    value = os.environ.get(ENV_VAR, "").strip()
+    if value in ("", "0"):
+        return None
+    return enable(value if value.lower().endswith(".json") else None)
+
+def count(name, amount=1):
+    """
+    Adds to an event counter. Does nothing while instrumentation is off.
+    """
+    if profiler is not None:
+        profiler.count(name, amount)
+
+def timed(name):
+    """
+    Decorator recording each call's duration under `name`. When
+    instrumentation is off at decoration time, returns the function as is.
+    """
+    def decorate(func):
+        if profiler is None:
+            return func
+        active = profiler
+        clock = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                active.record(name, (clock() - start) * 1000)
+        return wrapper
+    return decorate
@@ -1,14 +1,51 @@
-import tkinter as tk
-from gui import ChanceMusicDiceApp
+import sys
+import time
+
+# Taken as early as possible, to measure the time to the first frame.
+STARTED_AT = time.perf_counter()
 
 # Define the current version of your application
 __version__ = "1.1.0" # <--- Set your current app version here
 
-def main():
+def main(profile=False, profile_path=None):
+    # tkinter, Pillow and the GUI are only imported when the GUI is launched,
+    # so headless runs start quickly and work without a display.
+    import instrumentation
+    if profile:
+        instrumentation.enable(profile_path)
+    else:
+        instrumentation.enable_from_environment()
+    # Instrumentation has to be on before the GUI is imported; see instrumentation.py.
+    import tkinter as tk
+    from gui import ChanceMusicDiceApp
+
     root = tk.Tk()
     # Pass the version number to the GUI app
-    app = ChanceMusicDiceApp(root, __version__) 
+    app = ChanceMusicDiceApp(root, __version__, started_at=STARTED_AT)
     root.mainloop()
 
+    if instrumentation.profiler is not None and instrumentation.profiler.dump_path:
+        instrumentation.profiler.dump()
+
+def _split_profile_args(args):
+    """
+    Pulls `--profile` or `--profile=PATH` out of the arguments.
+    Returns (profile, profile_path, remaining arguments).
+    """
+    profile, profile_path, remaining = False, None, []
+    for arg in args:
+        if arg == "--profile":
+            profile = True
+        elif arg.startswith("--profile="):
+            profile, profile_path = True, arg.split("=", 1)[1] or None
+        else:
+            remaining.append(arg)
+    return profile, profile_path, remaining
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profile, profile_path, remaining = _split_profile_args(sys.argv[1:])
+    if remaining:
+        # Any other arguments mean a headless run, e.g. `python main.py --count 100`
+        import cli
+        sys.exit(cli.main(remaining))
+    main(profile, profile_path)
@@ -0,0 +1,103 @@
+"""
+Polyphonic rolling: K independent voices on one shared timeline.
+
+Each voice rolls its own stream of notes, one after another, with onsets
+worked out exactly from the duration and augmentation dice. The voices
+are merged into a single time-ordered stream through a heap holding one
+upcoming note per voice, so memory grows with the number of voices and
+not with the length of the piece.
+
+    for onset, voice, beats, roll in iter_ensemble(64, until=256, seed=1):
+        ...
+"""
+import heapq
+import math
+from fractions import Fraction
+
+import dice # Import our dice logic from dice.py
+
+# Voices roll this many notes at a time behind the scenes.
+DEFAULT_CHUNK_SIZE = 256
+
+def _ticks_per_beat():
+    """
+    Returns the smallest number of ticks per crotchet that makes every
+    dotted or undotted duration a whole number of ticks.
+    """
+    return math.lcm(*(
+        (beats * factor).denominator
+        for beats in dice.duration_beats.values()
+        for factor in dice.augmentation_factors.values()
+    ))
+
+# Onsets are kept as whole ticks while merging, which is exact and much
+# cheaper than adding Fractions, and only turned into beats when yielded.
+TICKS_PER_BEAT = _ticks_per_beat()
+
+def _voice_notes(generate, rng, count):
+    """
+    Yields (onset in ticks, length in ticks, roll dict) for one voice, from
+    `generate(n, rng)` returning dice.RollBatch chunks. Stops after `count`
+    notes, or never if it is None.
+    """
+    onset = 0
+    remaining = count
+    while remaining is None or remaining > 0:
+        n = DEFAULT_CHUNK_SIZE if remaining is None else min(DEFAULT_CHUNK_SIZE, remaining)
+        batch = generate(n, rng)
+        durations = batch.tables["duration"]
+        augmentations = batch.tables["augmentation"]
+        ticks = [
+            [int(dice.event_beats(duration, augmentation) * TICKS_PER_BEAT) for augmentation in augmentations]
+            for duration in durations
+        ]
+        for index, (duration, augmentation) in enumerate(zip(batch.columns["duration"], batch.columns["augmentation"])):
+            length = ticks[duration][augmentation]
+            yield onset, length, batch[index]
+            onset += length
+        if remaining is not None:
+            remaining -= n
+
+def iter_ensemble(voices, tet_choice=12, seed=None, until=None, notes_per_voice=None, generators=None):
+    """
+    Yields (onset, voice, beats, roll) for every note of `voices`
+    independent voices, in time order. `onset` and `beats` are exact
+    Fractions of a crotchet; notes starting together come out in voice order.
+
+    Each voice gets its own Roller spawned from `seed`, so a voice's notes
+    do not depend on how many other voices there are. The stream ends
+    once every voice has reached beat `until` or rolled `notes_per_voice`
+    notes; with neither, it goes on forever.
+
+    `generators` can give each voice its own source of notes: a list of
+    callables taking (n, rng) and returning a dice.RollBatch, such as
+    SequenceEngine.generate. By default every voice rolls the standard dice.
+    """
+    if generators is None:
+        generators = [lambda n, rng: dice.roll_all_dice_batch(n, tet_choice, rng)] * voices
+    elif len(generators) != voices:
+        raise ValueError(f"Expected {voices} generators, one per voice, not {len(generators)}.")
+    until_ticks = None if until is None else math.ceil(Fraction(until) * TICKS_PER_BEAT)
+
+    streams = [
+        _voice_notes(generate, rng, notes_per_voice)
+        for generate, rng in zip(generators, dice.Roller(seed).spawn(voices))
+    ]
+    heap = []
+    for voice, notes in enumerate(streams):
+        first = next(notes, None)
+        if first is not None:
+            heap.append((first[0], voice, first[1], first[2]))
+    heapq.heapify(heap)
+
+    while heap:
+        onset, voice, length, roll = heap[0]
+        if until_ticks is not None and onset >= until_ticks:
+            # Every other voice is at or past this point too.
+            return
+        yield Fraction(onset, TICKS_PER_BEAT), voice, Fraction(length, TICKS_PER_BEAT), roll
+        following = next(streams[voice], None)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (following[0], voice, following[1], following[2]))
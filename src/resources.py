@@ -0,0 +1,202 @@
+"""
+Shared resources for the GUI: where the bundled assets live, the bundled
+fonts, and one bounded cache for fonts, text measurements and images.
+"""
+import ctypes
+import ctypes.util
+import functools
+import os
+import sys
+from collections import OrderedDict
+
+import tkinter.font as tkFont
+
+# Fonts shipped in assets/fonts, registered for this process only at startup.
+BUNDLED_FONTS = (
+    "NotoSans-VariableFont_wdth,wght.ttf",
+    "NotoSansTifinagh-Regular.ttf",
+    "NotoSansMath-Regular.ttf",
+)
+
+# Most entries of each kind the shared cache keeps before dropping the
+# least recently used one.
+DEFAULT_CACHE_LIMITS = {
+    "font": 64,
+    "measure": 4096,
+    "image": 32,
+    "face": 256,
+}
+
+# --- Asset Paths ---
+
+@functools.lru_cache(maxsize=None)
+def asset_root():
+    """
+    Returns the absolute path of the assets directory, resolved once:
+    inside the PyInstaller bundle when frozen, otherwise next to src.
+    """
+    if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+        # Running as a PyInstaller bundle
+        return os.path.join(sys._MEIPASS, "assets")
+    # Running from source (assets is a sibling of src)
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+@functools.lru_cache(maxsize=256)
+def asset_path(relative_path):
+    """
+    Returns the absolute path of a file under the assets directory.
+    """
+    return os.path.join(asset_root(), relative_path)
+
+# --- Private Font Registration ---
+
+def _register_font_windows(path):
+    FR_PRIVATE = 0x10
+    return ctypes.windll.gdi32.AddFontResourceExW(path, FR_PRIVATE, 0) > 0
+
+def _register_font_macos(path):
+    core_foundation = ctypes.cdll.LoadLibrary(ctypes.util.find_library("CoreFoundation"))
+    core_text = ctypes.cdll.LoadLibrary(ctypes.util.find_library("CoreText"))
+    core_foundation.CFURLCreateFromFileSystemRepresentation.restype = ctypes.c_void_p
+    core_foundation.CFURLCreateFromFileSystemRepresentation.argtypes = (
+        ctypes.c_void_p, ctypes.c_char_p, ctypes.c_long, ctypes.c_bool)
+    core_foundation.CFRelease.argtypes = (ctypes.c_void_p,)
+    core_text.CTFontManagerRegisterFontsForURL.argtypes = (ctypes.c_void_p, ctypes.c_uint32, ctypes.c_void_p)
+    core_text.CTFontManagerRegisterFontsForURL.restype = ctypes.c_bool
+
+    encoded = os.fsencode(path)
+    url = core_foundation.CFURLCreateFromFileSystemRepresentation(None, encoded, len(encoded), False)
+    if not url:
+        return False
+    try:
+        kCTFontManagerScopeProcess = 1
+        return core_text.CTFontManagerRegisterFontsForURL(url, kCTFontManagerScopeProcess, None)
+    finally:
+        core_foundation.CFRelease(url)
+
+def _register_font_fontconfig(path):
+    library = ctypes.util.find_library("fontconfig")
+    if library is None:
+        return False
+    fontconfig = ctypes.cdll.LoadLibrary(library)
+    fontconfig.FcConfigGetCurrent.restype = ctypes.c_void_p
+    fontconfig.FcConfigAppFontAddFile.argtypes = (ctypes.c_void_p, ctypes.c_char_p)
+    return bool(fontconfig.FcConfigAppFontAddFile(fontconfig.FcConfigGetCurrent(), os.fsencode(path)))
+
+_registered_fonts = None
+
+def register_bundled_fonts():
+    """
+    Makes the bundled fonts available to Tk in this process without
+    installing them system-wide. Safe to call more than once; the work is
+    only done the first time. Must run before the fonts are first used.
+    Returns the paths that were registered.
+    """
+    global _registered_fonts
+    if _registered_fonts is not None:
+        return _registered_fonts
+
+    if sys.platform == "win32":
+        register = _register_font_windows
+    elif sys.platform == "darwin":
+        register = _register_font_macos
+    else:
+        register = _register_font_fontconfig
+
+    _registered_fonts = []
+    for filename in BUNDLED_FONTS:
+        path = asset_path(os.path.join("fonts", filename))
+        try:
+            if register(path):
+                _registered_fonts.append(path)
+            else:
+                print(f"Warning: Could not register bundled font {path}.")
+        except (OSError, AttributeError, TypeError) as e:
+            print(f"Warning: Could not register bundled font {path}: {e}")
+    return _registered_fonts
+
+# --- Shared Cache ---
+
+class ResourceCache:
+    """
+    One least-recently-used cache for everything the GUI builds from its
+    assets. Keys are tuples whose first element is the kind of resource
+    ("font", "measure", "image", ...), and each kind is bounded separately
+    by `limits` so that, say, a burst of new image sizes cannot push out
+    the fonts. Only use it from the Tk thread.
+    """
+    def __init__(self, limits=None):
+        self.limits = dict(DEFAULT_CACHE_LIMITS if limits is None else limits)
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, or None.
+        """
+        entries = self._entries.get(key[0])
+        value = entries.get(key) if entries is not None else None
+        if value is None:
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        entries = self._entries.setdefault(key[0], OrderedDict())
+        entries[key] = value
+        entries.move_to_end(key)
+        limit = self.limits.get(key[0])
+        while limit is not None and len(entries) > limit:
+            entries.popitem(last=False)
+        return value
+
+    def get_or_create(self, key, create):
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, create())
+        return value
+
+    def stats(self):
+        """
+        Returns hit and miss counts and the number of entries of each kind.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": {kind: len(entries) for kind, entries in self._entries.items()},
+        }
+
+class Resources:
+    """
+    The GUI's access point for assets: paths under the asset root, fonts
+    and text measurements served from one shared ResourceCache.
+    """
+    def __init__(self, cache=None):
+        self.root = asset_root()
+        self.cache = cache if cache is not None else ResourceCache()
+
+    def path(self, relative_path):
+        return asset_path(relative_path)
+
+    def font(self, family, size, weight="normal"):
+        """
+        Returns a tkFont.Font, creating it only the first time it is asked for.
+        """
+        return self.cache.get_or_create(
+            ("font", family, size, weight),
+            lambda: tkFont.Font(family=family, size=size, weight=weight),
+        )
+
+    def measure(self, font, text):
+        """
+        Returns the width of `text` in `font` in pixels, measured once.
+        Fonts from font() are never reconfigured, so their name identifies
+        their metrics.
+        """
+        return self.cache.get_or_create(("measure", font.name, text), lambda: font.measure(text))
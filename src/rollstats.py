@@ -0,0 +1,285 @@
+"""
+Running statistics over a stream of rolls, for checking in real time that
+a long session keeps to the distribution the dice are meant to have.
+
+Every aggregate is updated in constant time per roll: face counts, a
+chi-square statistic against the expected distribution, runs of the same
+face, and a histogram of the most recent rolls held in a fixed-size ring
+buffer. Only summary() does work proportional to the number of faces, so
+it can be called at a display's pace rather than the rolling pace.
+
+    stats = RollStatistics(dicesets.default_dice_set())
+    for roll in export.iter_rolls(100_000, 12, dice.Roller(1)):
+        stats.record(roll, 12)
+    print(format_summary(stats.summary()))
+"""
+import math
+from array import array
+from fractions import Fraction
+
+# Rolls kept in each die's sliding-window histogram.
+DEFAULT_WINDOW = 1000
+
+# --- Chi-Square ---
+
+def _log_gamma_prefix(a, x):
+    return -x + a * math.log(x) - math.lgamma(a)
+
+def chi_square_p_value(statistic, dof):
+    """
+    Returns the probability of a chi-square statistic at least this large
+    with `dof` degrees of freedom, i.e. the regularized upper incomplete
+    gamma function Q(dof / 2, statistic / 2).
+    """
+    if math.isinf(statistic):
+        return 0.0
+    if statistic <= 0:
+        return 1.0
+    a = dof / 2
+    x = statistic / 2
+    if x < a + 1:
+        # Series for the lower function, which converges quickly here.
+        term = total = 1.0 / a
+        n = a
+        for _ in range(10_000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(_log_gamma_prefix(a, x)))
+
+    # Continued fraction for the upper function (modified Lentz).
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10_000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        if abs(d) < tiny:
+            d = tiny
+        c = b + an / c
+        if abs(c) < tiny:
+            c = tiny
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return min(1.0, math.exp(_log_gamma_prefix(a, x)) * h)
+
+# --- One Die ---
+
+class DieStatistics:
+    """
+    Running statistics for one compiled die, fed with face codes.
+
+    The chi-square statistic sum((O - E)^2 / E) over faces is rewritten as
+    sum(O^2 / p) / N - N, so each roll only adds (2 * O + 1) / p for the
+    face it landed on. That sum is kept as an exact integer, scaled by the
+    common denominator of the 1 / p values, so it does not drift however
+    long the session runs.
+    """
+    def __init__(self, table, window=DEFAULT_WINDOW):
+        if window < 1:
+            raise ValueError("The window must hold at least one roll.")
+        self.table = table
+        self.faces = table.faces
+        self.window = window
+
+        total = sum(Fraction(weight) for weight in table.weights)
+        inverse = [total / Fraction(weight) if weight else None for weight in table.weights]
+        self._scale = math.lcm(*(value.denominator for value in inverse if value is not None))
+        # Faces that should never come up get 0 and are counted as unexpected.
+        self._multipliers = [int(value * self._scale) if value is not None else 0 for value in inverse]
+        self.possible_faces = sum(1 for weight in table.weights if weight)
+
+        self.total = 0
+        self.counts = [0] * len(self.faces)
+        self.unexpected = 0
+        self._scaled_squares = 0
+
+        self.current_code = None
+        self.current_run = 0
+        self.runs = 0
+        self.longest_runs = [0] * len(self.faces)
+
+        self._ring = array(table.typecode, [0]) * window
+        self._ring_next = 0
+        self.window_filled = 0
+        self.window_counts = [0] * len(self.faces)
+
+    def record(self, code):
+        """
+        Adds one roll of the face with integer code `code`.
+        """
+        count = self.counts[code]
+        self.counts[code] = count + 1
+        self.total += 1
+        multiplier = self._multipliers[code]
+        if multiplier:
+            self._scaled_squares += (2 * count + 1) * multiplier
+        else:
+            self.unexpected += 1
+
+        if code == self.current_code:
+            self.current_run += 1
+        else:
+            self.current_code = code
+            self.current_run = 1
+            self.runs += 1
+        if self.current_run > self.longest_runs[code]:
+            self.longest_runs[code] = self.current_run
+
+        position = self._ring_next
+        if self.window_filled == self.window:
+            self.window_counts[self._ring[position]] -= 1
+        else:
+            self.window_filled += 1
+        self._ring[position] = code
+        self.window_counts[code] += 1
+        self._ring_next = position + 1 if position + 1 < self.window else 0
+
+    def record_codes(self, codes):
+        """
+        Adds a sequence of face codes, such as a RollBatch column.
+        """
+        record = self.record
+        for code in codes:
+            record(code)
+
+    def chi_square(self):
+        """
+        Returns the chi-square statistic of the counts so far against the
+        die's weights, or infinity if a face of weight zero came up.
+        """
+        if self.unexpected:
+            return math.inf
+        if not self.total:
+            return 0.0
+        n = self.total
+        return (self._scaled_squares - self._scale * n * n) / (self._scale * n)
+
+    def expected_mean_run(self):
+        """
+        Returns the mean length of a run of one face that independent rolls
+        of this die would give, 1 / (1 - sum(p^2)).
+        """
+        repeat = sum(p * p for p in self.table.probabilities)
+        return math.inf if repeat >= 1 else 1 / (1 - repeat)
+
+    def summary(self):
+        """
+        Returns a dict of the counts, the chi-square test, the run lengths
+        and the sliding-window histogram, with faces as keys.
+        """
+        dof = self.possible_faces - 1
+        statistic = self.chi_square()
+        longest_code = max(range(len(self.faces)), key=self.longest_runs.__getitem__)
+        return {
+            "rolls": self.total,
+            "counts": dict(zip(self.faces, self.counts)),
+            "expected": {face: self.total * p for face, p in zip(self.faces, self.table.probabilities)},
+            "chi_square": statistic,
+            "dof": dof,
+            "p_value": chi_square_p_value(statistic, dof) if dof > 0 and self.total else None,
+            "current_run": (self.faces[self.current_code], self.current_run) if self.current_code is not None else None,
+            "longest_run": (self.faces[longest_code], self.longest_runs[longest_code]) if self.total else None,
+            "mean_run": self.total / self.runs if self.runs else 0.0,
+            "expected_mean_run": self.expected_mean_run(),
+            "window": dict(zip(self.faces, self.window_counts)),
+            "window_rolls": self.window_filled,
+        }
+
+# --- Whole Rolls ---
+
+class RollStatistics:
+    """
+    Running statistics for every die of a dice set. Dice whose table
+    depends on the TET, like the built-in pitch die, are tracked
+    separately for each table they have been rolled with.
+    """
+    def __init__(self, dice_set, window=DEFAULT_WINDOW):
+        self.dice_set = dice_set
+        self.window = window
+        self.rolls = 0
+        self._dice = {}
+
+    def _die(self, name, table):
+        stats = self._dice.get((name, table))
+        if stats is None:
+            stats = self._dice[(name, table)] = DieStatistics(table, self.window)
+        return stats
+
+    def record(self, results, tet_choice=12):
+        """
+        Adds one roll given as {die name: face}, as from DiceSet.roll.
+        """
+        for spec in self.dice_set.dice:
+            table = spec.table_for(tet_choice)
+            self._die(spec.name, table).record(table.codes[results[spec.name]])
+        self.rolls += 1
+
+    def record_batch(self, batch):
+        """
+        Adds every roll of a dice.RollBatch rolled from this dice set,
+        reading its code columns directly.
+        """
+        for spec in self.dice_set.dice:
+            table = spec.table_for(batch.tet_choice)
+            self._die(spec.name, table).record_codes(batch.columns[spec.name])
+        self.rolls += len(batch)
+
+    def reset(self):
+        self.rolls = 0
+        self._dice = {}
+
+    def summary(self):
+        """
+        Returns {"rolls": n, "dice": [die summary, ...]} in dice set order,
+        each die summary from DieStatistics.summary with the die's "name"
+        and "faces" (its number of faces) added.
+        """
+        order = {name: index for index, name in enumerate(self.dice_set.names)}
+        entries = sorted(self._dice.items(), key=lambda item: order.get(item[0][0], len(order)))
+        dice_summaries = []
+        for (name, table), stats in entries:
+            summary = stats.summary()
+            summary["name"] = name
+            summary["faces"] = len(table)
+            dice_summaries.append(summary)
+        return {"rolls": self.rolls, "dice": dice_summaries}
+
+def format_summary(summary, max_faces=12):
+    """
+    Returns a summary from RollStatistics.summary as plain text, listing
+    at most `max_faces` faces per die, the most frequent first.
+    """
+    names = [die["name"] for die in summary["dice"]]
+    lines = [f"{summary['rolls']:,} rolls"]
+    for die in summary["dice"]:
+        title = die["name"]
+        if names.count(title) > 1:
+            title += f" ({die['faces']} faces)"
+        p_value = "-" if die["p_value"] is None else f"{die['p_value']:.3f}"
+        lines.append("")
+        lines.append(f"{title}: chi-square {die['chi_square']:.2f} on {die['dof']} dof, p = {p_value}")
+        if die["longest_run"] is not None:
+            face, length = die["longest_run"]
+            current_face, current_length = die["current_run"]
+            lines.append(f"  runs: mean {die['mean_run']:.2f} (expected {die['expected_mean_run']:.2f}), "
+                         f"longest {length} x {face}, current {current_length} x {current_face}")
+        faces = sorted(die["counts"], key=die["counts"].get, reverse=True)[:max_faces]
+        width = max(len(face) for face in faces)
+        # Window bars are scaled to the most frequent listed face.
+        most = max(die["window"][face] for face in faces) or 1
+        for face in faces:
+            window_count = die["window"][face]
+            lines.append(f"  {face:<{width}} {die['counts'][face]:>10,}  expected {die['expected'][face]:>12,.1f}  "
+                         f"last {die['window_rolls']}: {window_count:>5} {'#' * round(window_count * 20 / most)}")
+        if len(die["counts"]) > max_faces:
+            lines.append(f"  ... and {len(die['counts']) - max_faces} more faces")
+    return "\n".join(lines)
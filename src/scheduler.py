@@ -0,0 +1,113 @@
+import time
+from collections import deque
+
+class DeadlineStats:
+    """
+    Timing record for a scheduler: how late (or early) each event fired
+    against its deadline, and how many deadlines were missed outright.
+    Only the most recent `window` jitter samples are kept.
+    """
+    def __init__(self, window=1000):
+        self.jitter = deque(maxlen=window)
+        self.events = 0
+        self.missed = 0
+
+    def record(self, lateness):
+        self.events += 1
+        self.jitter.append(lateness)
+
+    def reset(self):
+        self.jitter.clear()
+        self.events = 0
+        self.missed = 0
+
+    def summary(self):
+        """
+        Returns a dict of event counts and jitter statistics in milliseconds.
+        """
+        samples = sorted(abs(lateness) for lateness in self.jitter)
+        if not samples:
+            return {"events": self.events, "missed": self.missed, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "events": self.events,
+            "missed": self.missed,
+            "mean_ms": 1000 * sum(samples) / len(samples),
+            "p99_ms": 1000 * samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+            "max_ms": 1000 * samples[-1],
+        }
+
+class DriftFreeScheduler:
+    """
+    Fires `on_tick` repeatedly through Tk's after(), timed against a
+    monotonic clock. `on_tick` returns the number of seconds until the next
+    event, and each deadline is the previous deadline plus that interval
+    rather than "now" plus it, so timer lateness never accumulates.
+
+    When an event fires so late that the deadlines after it have also
+    passed (lateness of at least the interval), those deadlines are counted
+    as missed and skipped, keeping to the original timeline instead of
+    firing a burst of catch-up events. Lateness of more than `max_lateness`
+    seconds within one interval also counts as a miss, and the timeline
+    restarts from now.
+    """
+    def __init__(self, master, on_tick, clock=time.perf_counter, max_lateness=0.25):
+        self.master = master
+        self.on_tick = on_tick
+        self.clock = clock
+        self.max_lateness = max_lateness
+        self.stats = DeadlineStats()
+
+        self._after_id = None
+        self._deadline = None
+        self._interval = None
+
+    @property
+    def running(self):
+        return self._deadline is not None
+
+    def start(self, delay=0.0):
+        """
+        Starts firing after `delay` seconds. Restarting clears the stats.
+        """
+        self.stop()
+        self.stats.reset()
+        self._deadline = self.clock() + delay
+        self._interval = None
+        self._schedule()
+
+    def stop(self):
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+        self._after_id = None
+        self._deadline = None
+
+    def _schedule(self):
+        delay_ms = max(0, round((self._deadline - self.clock()) * 1000))
+        self._after_id = self.master.after(delay_ms, self._fire)
+
+    def _fire(self):
+        self._after_id = None
+        if self._deadline is None:
+            return
+
+        now = self.clock()
+        lateness = now - self._deadline
+        self.stats.record(lateness)
+        if self._interval and lateness >= self._interval:
+            skipped = int(lateness // self._interval)
+            self.stats.missed += skipped
+            self._deadline += skipped * self._interval
+            lateness = now - self._deadline
+        if lateness > self.max_lateness:
+            self.stats.missed += 1
+            self._deadline = now
+
+        interval = self.on_tick()
+        if self._deadline is None or interval is None:
+            # Stopped from inside on_tick, or the tick asked to stop.
+            self._deadline = None
+            return
+
+        self._interval = max(0.0, interval)
+        self._deadline += self._interval
+        self._schedule()
@@ -0,0 +1,349 @@
+"""
+Local roll server for networked performers, built on asyncio alone.
+
+    python server.py --host 127.0.0.1 --port 8765
+
+Endpoints (all take ?tet=<steps per octave, default 12> and an optional ?client=<id>&seed=<seed>):
+
+    GET /roll               one roll as a JSON object
+    GET /rolls?n=100        {"rolls": [...]} with n rolls
+    GET /stream?rate=8      WebSocket pushing one JSON roll per message,
+                            `rate` rolls per second (omit for as fast as
+                            the client reads)
+
+Each client id gets its own Roller, seeded from ?seed= the first time the
+client is seen or spawned from the server's root seed otherwise, so a
+client's sequential requests are reproducible. Single-roll requests that
+arrive together are answered from one batch roll per client.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import dice # Import our dice logic from dice.py
+
+MAX_BATCH_ROLLS = 100_000
+MAX_CLIENT_STREAMS = 10_000
+MAX_HEADER_BYTES = 16 * 1024
+# Clients only send control frames and small messages on /stream.
+MAX_WEBSOCKET_FRAME_BYTES = 4 * 1024
+STREAM_CHUNK_SIZE = 256
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class BadRequest(Exception):
+    pass
+
+class FrameTooLarge(Exception):
+    pass
+
+# --- Rolling ---
+
+class RollCoalescer:
+    """
+    Collects single-roll requests made during one pass of the event loop
+    and answers each client's share of them from one batch roll.
+    """
+    def __init__(self, server):
+        self.server = server
+        self._pending = {}
+        self._flush_scheduled = False
+        self.batches = 0
+        self.requests = 0
+
+    def roll(self, client_id, tet_choice, seed=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (client_id, tet_choice)
+        if key not in self._pending:
+            self._pending[key] = (seed, [])
+        self._pending[key][1].append(future)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return future
+
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        self._flush_scheduled = False
+        for (client_id, tet_choice), (seed, futures) in pending.items():
+            rng = self.server.roller_for(client_id, seed)
+            batch = dice.roll_all_dice_batch(len(futures), tet_choice, rng)
+            self.batches += 1
+            self.requests += len(futures)
+            for future, roll in zip(futures, batch):
+                if not future.done():
+                    future.set_result(roll)
+
+# --- HTTP ---
+
+def _http_response(status, body, content_type="application/json", keep_alive=True):
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}.get(status, "Error")
+    headers = (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: {content_type}; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return headers.encode("ascii") + body
+
+def _json_body(value):
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+async def _read_request(reader):
+    """
+    Reads one request head. Returns (method, path, query, headers), or None
+    when the client has closed the connection.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise BadRequest("Request headers too large.")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise BadRequest("Malformed request line.")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    url = urlsplit(target)
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    return method, url.path, query, headers
+
+def _parse_tet(query):
+    try:
+        tet_choice = int(query.get("tet", 12))
+    except ValueError:
+        raise BadRequest("tet must be a whole number.")
+    if not 1 <= tet_choice <= dice.MAX_TET:
+        raise BadRequest(f"tet must be between 1 and {dice.MAX_TET}.")
+    return tet_choice
+
+def _seed_value(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+def _parse_seed(query):
+    seed = query.get("seed")
+    return None if seed is None else _seed_value(seed)
+
+def _parse_rate(query):
+    if "rate" not in query:
+        return None
+    try:
+        rate = float(query["rate"])
+    except ValueError:
+        raise BadRequest("rate must be a number.")
+    if rate <= 0:
+        raise BadRequest("rate must be positive.")
+    return rate
+
+# --- WebSocket ---
+
+def _websocket_frame(payload, opcode=0x1):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+async def _read_websocket_frame(reader):
+    """
+    Reads one client frame and returns (opcode, payload). Raises
+    FrameTooLarge, before reading the payload, if it is over
+    MAX_WEBSOCKET_FRAME_BYTES.
+    """
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_WEBSOCKET_FRAME_BYTES:
+        raise FrameTooLarge(f"Frame of {length} bytes is over the {MAX_WEBSOCKET_FRAME_BYTES} byte limit.")
+    mask = await reader.readexactly(4) if second & 0x80 else b"\x00\x00\x00\x00"
+    data = await reader.readexactly(length)
+    return opcode, bytes(byte ^ mask[i % 4] for i, byte in enumerate(data))
+
+# --- Server ---
+
+class RollServer:
+    """
+    Serves rolls over HTTP and WebSocket. See the module docstring for the endpoints.
+    """
+    def __init__(self, seed=None):
+        self.root = dice.Roller(seed)
+        self.coalescer = RollCoalescer(self)
+        self._rollers = OrderedDict()
+
+    def roller_for(self, client_id, seed=None):
+        """
+        Returns the Roller for a client, creating it on first use. Anonymous
+        requests (no client id) share a stream. The least recently used
+        streams are dropped beyond MAX_CLIENT_STREAMS.
+        """
+        roller = self._rollers.get(client_id)
+        if roller is not None:
+            self._rollers.move_to_end(client_id)
+            return roller
+        roller = dice.Roller(seed) if seed is not None else self.root.spawn(1)[0]
+        self._rollers[client_id] = roller
+        while len(self._rollers) > MAX_CLIENT_STREAMS:
+            self._rollers.popitem(last=False)
+        return roller
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, path, query, headers = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+
+                    if path == "/stream" and headers.get("upgrade", "").lower() == "websocket":
+                        await self._handle_stream(reader, writer, query, headers)
+                        break
+                    if method != "GET":
+                        raise BadRequest("Only GET is supported.")
+                    body = await self._handle_http(path, query)
+                    status = 200 if body is not None else 404
+                    if body is None:
+                        body = _json_body({"error": f"Unknown path {path}"})
+                except BadRequest as e:
+                    status, body, keep_alive = 400, _json_body({"error": str(e)}), False
+
+                writer.write(_http_response(status, body, keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_http(self, path, query):
+        client_id = query.get("client")
+        tet_choice = _parse_tet(query)
+        seed = _parse_seed(query)
+
+        if path == "/roll":
+            roll = await self.coalescer.roll(client_id, tet_choice, seed)
+            return _json_body(roll)
+
+        if path == "/rolls":
+            try:
+                n = int(query.get("n", 1))
+            except ValueError:
+                raise BadRequest("n must be a whole number.")
+            if not 0 <= n <= MAX_BATCH_ROLLS:
+                raise BadRequest(f"n must be between 0 and {MAX_BATCH_ROLLS}.")
+            batch = dice.roll_all_dice_batch(n, tet_choice, self.roller_for(client_id, seed))
+            return _json_body({"rolls": list(batch)})
+
+        return None
+
+    async def _handle_stream(self, reader, writer, query, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise BadRequest("Missing Sec-WebSocket-Key.")
+        tet_choice = _parse_tet(query)
+        rate = _parse_rate(query)
+        rng = self.roller_for(query.get("client"), _parse_seed(query))
+
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode("ascii")).digest()).decode("ascii")
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            + f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+
+        closed = asyncio.Event()
+
+        async def watch_client():
+            try:
+                while True:
+                    opcode, payload = await _read_websocket_frame(reader)
+                    if opcode == 0x8:
+                        writer.write(_websocket_frame(payload[:2], opcode=0x8))
+                        break
+                    if opcode == 0x9:
+                        writer.write(_websocket_frame(payload, opcode=0xA))
+            except FrameTooLarge:
+                # 1009: message too big.
+                writer.write(_websocket_frame(struct.pack("!H", 1009), opcode=0x8))
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                closed.set()
+
+        watcher = asyncio.create_task(watch_client())
+        try:
+            loop = asyncio.get_running_loop()
+            next_send = loop.time()
+            while not closed.is_set():
+                chunk = 1 if rate else STREAM_CHUNK_SIZE
+                for roll in dice.roll_all_dice_batch(chunk, tet_choice, rng):
+                    writer.write(_websocket_frame(_json_body(roll)))
+                # Backpressure: wait until the client has taken what we sent.
+                await writer.drain()
+                if rate:
+                    next_send += 1.0 / rate
+                    delay = next_send - loop.time()
+                    if delay > 0:
+                        try:
+                            await asyncio.wait_for(closed.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                else:
+                    await asyncio.sleep(0)
+        except ConnectionError:
+            pass
+        finally:
+            watcher.cancel()
+
+async def serve(host="127.0.0.1", port=8765, seed=None):
+    """
+    Starts a RollServer and returns the asyncio server object.
+    """
+    roll_server = RollServer(seed)
+    return await asyncio.start_server(roll_server.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve chance music dice rolls over HTTP and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=_seed_value, default=None, help="root seed for client streams")
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = await serve(args.host, args.port, args.seed)
+        print(f"Serving rolls on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()